@@ -0,0 +1,71 @@
+# Copyright (c) 2025 ETH Zurich.
+#                    All rights reserved.
+#
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+# Exact all-pairs distance histograms based on multi-source (bit-parallel) BFS
+
+from .Analysis import Analysis
+from .results import Results
+from .common import is_in_db
+from .simplepmap import pmap
+from .bfs import bitparallel_bfs
+from .symmetry import representatives
+from topogen.common import from_list_graph_to_sparse_matrix
+import numpy as np
+
+
+class DistanceAnalysis(Analysis):
+    def __init__(self, datafilename="distances.db", lanes=256):
+        super(DistanceAnalysis,self).__init__()
+        self.datafile = self.datafilefolder + datafilename
+        self.lanes = lanes
+
+    def analyse(self, networks, maxlength : int, parallel=False):
+        res = Results(self.datafile)
+
+        for network in networks:
+
+            print("Analysing all-pairs distances on %s with %d endnodes" %(network.name,network.N))
+            if not is_in_db(network,res,maxlength):
+
+                sparse_matrix_graph = from_list_graph_to_sparse_matrix(network.get_topo())
+                sparse_matrix_graph.edge = network.edge
+                collect = res.collector(tag="distance-histogram", maxlen=maxlength, len=Results.Int, pairs=Results.Int, topo=network.name, n_r=network.R, r=network.nr, n_e=network.N, p=network.p)
+                collecte = res.collector(tag="eccentricity", maxlen=maxlength, router=Results.Int, ecc=Results.Int, topo=network.name, n_r=network.R, r=network.nr, n_e=network.N, p=network.p)
+                self.__all_pairs_distances(graph=sparse_matrix_graph, limit=maxlength, collect=collect, collecte=collecte, sources=representatives(network), parallel=parallel)
+                res.commit()
+            else:
+                print("     --> skip, already in database")
+
+        res.close()
+
+    # private methods
+    def __all_pairs_distances(self, graph, limit, collect, collecte, sources=None, parallel=False):
+        # vertex-transitive: every router has the distances of the representatives
+        weight = 1 if sources is None else graph.edge // len(sources)
+        if sources is None:
+            sources = np.arange(graph.edge)
+        targets = np.zeros(graph.shape[0], dtype=bool)
+        targets[:graph.edge] = True
+        batches = [sources[i:i+self.lanes] for i in range(0, len(sources), self.lanes)]
+
+        def doall(batch):
+            return bitparallel_bfs(graph, batch, targets, limit)
+
+        if parallel:
+            out = pmap(doall, batches)
+        else:
+            out = map(doall, batches)
+
+        counts = np.zeros(limit+1, dtype=np.int64)
+        for batch, (c, ecc) in zip(batches, out):
+            counts[:len(c)] += c * weight
+            if weight > 1:
+                collecte.many(router=np.arange(graph.edge), ecc=np.full(graph.edge, ecc[0]))
+                continue
+            collecte.many(router=batch, ecc=ecc)
+
+        lengths = np.flatnonzero(counts[1:]) + 1
+        collect.many(len=lengths, pairs=counts[lengths])
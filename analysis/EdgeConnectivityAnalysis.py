@@ -0,0 +1,50 @@
+# Copyright (c) 2025 ETH Zurich.
+#                    All rights reserved.
+#
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+# Unbounded edge connectivity lambda(a,b) of all pairs of routers with endpoints,
+# read from a Gomory-Hu tree (R-1 maximum flows) instead of one flow per pair
+
+from .Analysis import Analysis
+from .results import Results
+from .common import is_in_db, fingerprint
+from .gomoryhu import GomoryHuTree
+from topogen.common import from_list_graph_to_sparse_matrix
+import numpy as np
+
+
+class EdgeConnectivityAnalysis(Analysis):
+    def __init__(self, datafilename="edge_connectivity.db"):
+        super(EdgeConnectivityAnalysis,self).__init__()
+        self.datafile = self.datafilefolder + datafilename
+
+    def analyse(self, networks, aggregate=False):
+        res = Results(self.datafile)
+        # aggregate: one weighted row per lambda_ab, the pairs are not stored
+        collector = res.aggregator if aggregate else res.collector
+        for network in networks:
+
+            print("Analysing edge connectivity on %s with %d endnodes" %(network.name,network.N))
+            # path lengths are unbounded, runs are stored with maxlen 0
+            if not is_in_db(network,res,0):
+
+                sparse_matrix_graph = from_list_graph_to_sparse_matrix(network.get_topo())
+                pair = {} if aggregate else {'a': Results.Int, 'b': Results.Int}
+                collect = collector(**pair, lambda_ab=Results.Int,
+                        topo=network.name, n_r=network.R, r=network.nr, n_e=network.N, p=network.p, tag="edge-connectivity", maxlen=0,
+                        exact=1, fingerprint=fingerprint(sparse_matrix_graph))
+
+                connectivity = GomoryHuTree(sparse_matrix_graph).matrix(np.arange(network.edge))
+                # unordered pairs a < b, lambda is symmetric
+                a, b = np.triu_indices(network.edge, 1)
+                if aggregate:
+                    collect.many(lambda_ab=connectivity[a, b])
+                else:
+                    collect.many(a=a, b=b, lambda_ab=connectivity[a, b])
+                res.commit()
+            else:
+                print("     --> skip, already in database")
+
+        res.close()
@@ -10,41 +10,73 @@
 # Based on Ford-Fulkerson
 
 from .Analysis import Analysis
-from. simplepmap import pmap
 from .results import Results
-from topogen.common import from_list_graph_to_matrix_graph
-from .common import is_in_db
+from topogen.common import from_list_graph_to_sparse_matrix
+from .common import is_in_db, fingerprint, factor_runs
+from .residual import ResidualGraph, ConnectivityCache, connectivity_databases, reused_cache, search_parallel
+from .adaptive import run_adaptive
+from .gomoryhu import GomoryHuTree, bound
 import numpy as np
 import random
-from itertools import permutations
-from scipy.sparse import csr_matrix
+from itertools import permutations, combinations
 
 
 class EdgeDisjointPathAnalyis(Analysis):
-    bits = np.array(2**np.arange(50), dtype=np.int64)
-
-    def __init__(self, datafilename="edge_disjoint_paths.db", number_of_samples=1000, all_combinations=False):
+    # paths and runs of this analysis, see VertexDisjointPathAnalysis
+    vertex_disjoint = False
+    description = "edge disjoint paths"
+    tag = "connectivity"
+    # other results with runs of this tag (reuse)
+    databases = connectivity_databases
+
+    def __init__(self, datafilename="edge_disjoint_paths.db", number_of_samples=1000, all_combinations=False, batch_size=100):
         super(EdgeDisjointPathAnalyis,self).__init__()
         self.datafile = self.datafilefolder + datafilename
         self.number_of_samples = number_of_samples
+        self.batch = batch_size
         self.all_combinations = all_combinations
 
-    def analyse(self, networks, maxlength : int):
+    def analyse(self, networks, maxlength : int, ci=None, aggregate=False, reuse=False, prune=False, factor=None):
         res = Results(self.datafile)
+        # aggregate: one weighted row per (len, c_ab), the pairs are not stored
+        self.aggregate = aggregate
+        collector = res.aggregator if aggregate else res.collector
+        # factor: low-connectivity search, only pairs with c_l <= factor*r (and links) are stored
+        if factor is not None and aggregate:
+            raise Exception('the low-connectivity search stores the routers, it cannot be aggregated')
         for network in networks:          
 
-            print("Analysing edge disjoint paths on %s with %d endnodes" %(network.name,network.N))
-            if not is_in_db(network,res,maxlength):
+            print("Analysing %s on %s with %d endnodes" %(self.description,network.name,network.N))
+            if not is_in_db(network,res,maxlength,factor_runs(res, factor)):
                     
-                matrix_graph = from_list_graph_to_matrix_graph(network.get_topo())
-                matrix_graph.edge = network.edge
-                matrix_graph.vertices = network.R
+                sparse_matrix_graph = from_list_graph_to_sparse_matrix(network.get_topo())
+                sparse_matrix_graph.edge = network.edge
+                sparse_matrix_graph.vertices = network.R
+                # the greedy c_l breaks ties by router id, it is not invariant under the
+                # automorphisms of vertex-transitive topologies: no representative routers
+                exact = self.all_combinations
+
+                # reuse: c_XY of earlier connectivity runs on this graph
+                graph_fingerprint = fingerprint(sparse_matrix_graph)
+                cache = reused_cache([self.datafile] + [self.datafilefolder + d for d in self.databases] if reuse else [], graph_fingerprint, maxlength, tag=self.tag)
+                # prune: searches stop at the unbounded edge connectivity of their routers (also
+                # bounds the vertex-disjoint paths)
+                connectivity = GomoryHuTree(sparse_matrix_graph).matrix(np.arange(network.edge)) if prune else None
                 
-                collect = res.collector(a=Results.Int, b=Results.Int,
-                        c_ab=Results.Int, len=Results.Int, 
-                        topo=network.name, n_r=network.R, r=network.nr, n_e=network.N, p=network.p, tag="connectivity", maxlen=maxlength)
+                # same comparison as the plot (c_ab <= r*factor)
+                cutoff = None if factor is None else int(factor * network.nr)
 
-                self.__count_edge_disjoint_paths(g=matrix_graph, limit=maxlength, collect=collect, count=self.number_of_samples)
+                pair = {} if aggregate else {'a': Results.Int, 'b': Results.Int}
+                collect = collector(**pair,
+                        c_ab=Results.Int, len=Results.Int, 
+                        topo=network.name, n_r=network.R, r=network.nr, n_e=network.N, p=network.p, tag=self.tag, maxlen=maxlength,
+                        exact=int(exact), fingerprint=graph_fingerprint, **({} if factor is None else {'factor': factor}))
+
+                estimate = self.__count_edge_disjoint_paths(g=sparse_matrix_graph, limit=maxlength, collect=collect, count=self.number_of_samples, ci=None if exact else ci, cache=cache, connectivity=connectivity, cutoff=cutoff)
+                if reuse:
+                    print("     --> reused %d of %d c_XY" % (cache.hits, cache.queries))
+                if ci and not exact:
+                    res.update_run(collect, ci=ci, ci_error=estimate.error(), samples=estimate.n)
                 res.commit()
             else:
                 print("     --> skip, already in database")
@@ -52,65 +84,51 @@ class EdgeDisjointPathAnalyis(Analysis):
         res.close()
 
     # Private Methods
-    def __prepare_graph(self,g):
-        h = csr_matrix(g)
-        for i in range(g.shape[0]):
-            idx = h[i,:].nonzero()[1]
-            h[i,idx] = 2**np.arange(len(idx))
-        return h
-
-    def __bfs(self,X,Y, limit, h):
-        fringe = np.zeros((h.shape[0],))
-        seen = np.zeros((h.shape[0],))
-        fringe[X] = 1
-        seen[X] = -1
-        for _ in range(limit):
-            step = h.dot(fringe)
-            new = (step > 0) & (seen == 0)
-            fringe[new] = 1
-            seen[new] = step[new]
-            if new[Y].any():
-                break
-        found = seen[Y] > 0
-        if not found.any():
-            return None
-        cur = Y[found.nonzero()[0][0]]
-        path = []
-        while cur not in X:
-            nextport = ((self.bits & np.int64(seen[cur])) > 0).nonzero()[0][0]
-            next = h[cur,:].indices[nextport]
-            path.append((cur, next))
-            cur = next
-        return path
-
-    def __c_XY(self,X,Y, limit, h):
-        g = h.tocsr(copy=True)
-        res = np.zeros((limit+1,), dtype=np.int32)
-        while True:
-            p = self.__bfs(X,Y, limit, g)
-            if not p: break
-            res[len(p):] += 1
-            for s,t in p:
-                g[s,t] = 0
-                g[t,s] = 0
-        return res
-
-    def __count_edge_disjoint_paths(self, g, limit, collect, count = 1000):
+    def __count_edge_disjoint_paths(self, g, limit, collect, count = 1000, ci=None, cache=None, connectivity=None, cutoff=None):
         r = list(range(0, g.edge))
-        if self.all_combinations:
-            pairs = list(permutations(r, 2))
-        else:
-            pairs = [random.sample(r, 2) for _ in range(0, count)]
-
-        h = self.__prepare_graph(g)
-
-        def doall(ab):
-            a,b = ab
-            c_ab = self.__c_XY([a], [b], limit, h)
-            return c_ab
+        h = ResidualGraph(g, vertex_disjoint=self.vertex_disjoint)
+        cache = cache or ConnectivityCache()
+        degree = np.diff(h.indptr)
+
+        # upper bounds that stop the search of a pair early, the results below them are exact
+        def bounds(X, Y):
+            found = []
+            if connectivity is not None:
+                found.append(bound(connectivity, X, Y))
+            if cutoff is not None:
+                # low-connectivity search: cutoff+1 paths rule the pair out, degrees bound the paths
+                found += [cutoff + 1, degree[X].sum(), degree[Y].sum()]
+            return min(found) if found else None
+
+        def search(queries):
+            return search_parallel(h, queries, limit, bounds)
+
+        def batch(n):
+            if self.all_combinations and cutoff is not None:
+                # c_l(a,b) of the unordered pair is stored for both directions
+                pairs = list(combinations(r, 2))
+            elif self.all_combinations:
+                pairs = list(permutations(r, 2))
+            else:
+                pairs = [random.sample(r, 2) for _ in range(0, n)]
 
-        out = pmap(doall, pairs)
+            out = cache.resolve([([a], [b]) for a, b in pairs], limit, search)
 
-        for (a,b),(c_ab) in zip(pairs, out):
+            ab = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+            c_ab = np.array(out, dtype=np.int64).reshape(-1, limit+1)
+            # one batch of rows per length
             for i in range(1, limit+1):
-                collect(len=i, a=a, b=b, c_ab=c_ab[i])
+                if cutoff is not None:
+                    # candidates only: paths are found in non-decreasing length, a search stopped
+                    # above the cutoff leaves exact c_l below it
+                    keep = (c_ab[:, i] <= cutoff) | ((i == 1) & (c_ab[:, i] > 0))
+                    a, b = ab[keep, 0], ab[keep, 1]
+                    collect.many(len=i, a=np.concatenate([a, b]), b=np.concatenate([b, a]), c_ab=np.tile(c_ab[keep, i], 2))
+                elif self.aggregate:
+                    collect.many(len=i, c_ab=c_ab[:, i])
+                else:
+                    collect.many(len=i, a=ab[:, 0], b=ab[:, 1], c_ab=c_ab[:, i])
+            # plotted: the connectivity of the pairs for every path length
+            return [(i, c_ab[:, i]) for i in range(1, limit+1)]
+
+        return run_adaptive(batch, count, ci, batch=self.batch)
@@ -7,7 +7,7 @@
 # Main author: Jascha Krattenmacher
 
 from .Plotter import Plotter
-from .common import make_topos, find_runs
+from .common import make_topos, find_runs, weight_column, factor_runs
 from .EdgeDisjointPathAnalysis import EdgeDisjointPathAnalyis
 from .results import Results, pyplot 
 
@@ -25,17 +25,17 @@ class EdgeDisjointPathPlotter(Plotter):
 
         res = Results(ed_analysis.datafile)
 
-        runids = find_runs(networks,res,"connectivity", maxlength)
+        runids = find_runs(networks,res,"connectivity", maxlength, factor_runs(res))
         runids = "(" + ", ".join(str(x) for x in runids) + ")"
 
         runwhere = "runid in " + runids
-        select = 'c_ab, "l="||len, case when topo like "JF-%" then substr(topo, 4) || "-JF" else topo end'
+        select = 'c_ab, "l="||len, case when topo like "JF-%" then substr(topo, 4) || "-JF" else topo end, ' + weight_column(res)
         where = 'len <=' + str(maxlength)
 
         if size is None:
             size = str((maxlength + 1) * 1.5) + "x" + str(1.25 * (len(networks)+1))
 
-        pyplot(outfile=outfile, size=size, manual=False, datafile=ed_analysis.datafile, select=select, runwhere=runwhere, where=where, plotType='edge_disjoint_path_count', density=density, label="Diversity (count) of non-minimal paths $c_{i}(A,B)$ \n $N = " + str(c) + "$", maxlength=maxlength, sqlLength=3, jellyfish=jellyfish)
+        pyplot(outfile=outfile, size=size, manual=False, datafile=ed_analysis.datafile, select=select, runwhere=runwhere, where=where, plotType='edge_disjoint_path_count', density=density, label="Diversity (count) of non-minimal paths $c_{i}(A,B)$ \n $N = " + str(c) + "$", maxlength=maxlength, sqlLength=4, jellyfish=jellyfish)
 
     def plot_low_connectivity(self, topos : [str], classes : [int], length : [int], factor=0.75, outfile = "plot.pdf", size = None, noEdges = False, detailedTicks  = False, normalizedScale = False):
         assert(factor > 0 and factor <= 1)
@@ -49,12 +49,13 @@ class EdgeDisjointPathPlotter(Plotter):
                 networks = make_topos([topo],[c], False)
 
                 ed_analysis = EdgeDisjointPathAnalyis("low_connectivity.db", all_combinations=True)
-                ed_analysis.analyse(networks,max(length))
+                # low-connectivity search: only the pairs with c_l <= factor*r are computed exactly and stored
+                ed_analysis.analyse(networks,max(length),factor=factor)
                 self.plotted_topologies_info(outfile,networks)
 
                 res = Results(ed_analysis.datafile)
 
-                runids = find_runs(networks,res,"connectivity", max(length))
+                runids = find_runs(networks,res,"connectivity", max(length), factor_runs(res, factor))
                 runids = "(" + ", ".join(str(x) for x in runids) + ")"
                
                 length.sort()
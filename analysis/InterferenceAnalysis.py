@@ -10,46 +10,68 @@
 # Based on Ford-Fulkerson
 
 from .Analysis import Analysis
-from. simplepmap import pmap
+from .simplepmap import forall
 from .results import Results
-from topogen.common import from_list_graph_to_matrix_graph
+from topogen.common import from_list_graph_to_sparse_matrix
 from itertools import permutations
-from .common import is_in_db
+from .common import is_in_db, fingerprint
+from .residual import ResidualGraph, ConnectivityCache, lanes, connectivity_databases, reused_cache, search_chunk, search_parallel
+from .adaptive import run_adaptive
+from .gomoryhu import GomoryHuTree, bound
+from collections import Counter
+from os import getpid
 import numpy as np
 import random
-from scipy.sparse import csr_matrix
 
 
 class InterferenceAnalysis(Analysis):
-    bits = np.array(2**np.arange(50), dtype=np.int64)
-
-    def __init__(self, datafilename="interference.db", number_of_samples=1000, all_combinations=False):
+    def __init__(self, datafilename="interference.db", number_of_samples=1000, all_combinations=False, batch_size=50):
         super(InterferenceAnalysis,self).__init__()
         self.datafile = self.datafilefolder + datafilename
         self.number_of_samples = number_of_samples
+        self.batch = batch_size
         self.all_combinations = all_combinations
 
-    def analyse(self, networks, maxlength : int):
+    def analyse(self, networks, maxlength : int, ci=None, aggregate=False, reuse=False, prune=False, stream=False):
         res = Results(self.datafile)
+        # aggregate: one weighted row per distinct values, the routers are not stored
+        self.aggregate = aggregate
+        collector = res.aggregator if aggregate else res.collector
         for network in networks:          
 
             print("Analysing interference on %s with %d endnodes" %(network.name,network.N))
             if not is_in_db(network,res,maxlength):
                     
-                matrix_graph = from_list_graph_to_matrix_graph(network.get_topo())
-                matrix_graph.edge = network.edge
-                matrix_graph.vertices = network.R
-
-                collectx = res.collector(a=Results.Int, b=Results.Int, c=Results.Int, d=Results.Int, 
+                sparse_matrix_graph = from_list_graph_to_sparse_matrix(network.get_topo())
+                sparse_matrix_graph.edge = network.edge
+                sparse_matrix_graph.vertices = network.R
+
+                # reuse: c_XY of earlier connectivity runs on this graph
+                graph_fingerprint = fingerprint(sparse_matrix_graph)
+                cache = reused_cache([self.datafile] + [self.datafilefolder + d for d in connectivity_databases] if reuse else [], graph_fingerprint, maxlength)
+                # prune: searches stop at the unbounded edge connectivity of their routers
+                connectivity = GomoryHuTree(sparse_matrix_graph).matrix(np.arange(network.edge)) if prune else None
+
+                quadruple = {} if aggregate else {'a': Results.Int, 'b': Results.Int, 'c': Results.Int, 'd': Results.Int}
+                collectx = collector(**quadruple,
                         x_abcd=Results.Int, c_abcd=Results.Int, c_acd=Results.Int, c_acb=Results.Int, c_ab=Results.Int, c_cd=Results.Int,
                         len=Results.Int, 
-                        topo=network.name, n_r=network.R, r=network.nr, n_e=network.N, p=network.p, tag="interference", maxlen=maxlength)
+                        topo=network.name, n_r=network.R, r=network.nr, n_e=network.N, p=network.p, tag="interference", maxlen=maxlength, exact=int(self.all_combinations), fingerprint=graph_fingerprint)
 
-                collectc = res.collector(a=Results.Int, b=Results.Int,
+                pair = {} if aggregate else {'a': Results.Int, 'b': Results.Int}
+                collectc = collector(**pair,
                         c_ab=Results.Int, len=Results.Int, 
-                        topo=network.name, n_r=network.R, r=network.nr, n_e=network.N, p=network.p, tag="connectivity", maxlen=maxlength)
-
-                self.__interference_analysis(g=matrix_graph, limit=maxlength, collectc=collectc, collectx=collectx, count=self.number_of_samples)
+                        topo=network.name, n_r=network.R, r=network.nr, n_e=network.N, p=network.p, tag="connectivity", maxlen=maxlength, exact=int(self.all_combinations), fingerprint=graph_fingerprint)
+
+                estimate = self.__interference_analysis(g=sparse_matrix_graph, limit=maxlength, collectc=collectc, collectx=collectx, count=self.number_of_samples, ci=None if self.all_combinations else ci, cache=cache, connectivity=connectivity, stream=res if stream else None)
+                if reuse:
+                    print("     --> reused %d of %d c_XY" % (cache.hits, cache.queries))
+                if ci and not self.all_combinations:
+                    for collect in (collectx, collectc):
+                        res.update_run(collect, ci=ci, ci_error=estimate.error(), samples=estimate.n)
+                if stream:
+                    for collect in (collectx, collectc):
+                        res.merge_shards(collect)
                 res.commit()
             else:
                 print("     --> skip, already in database")
@@ -57,71 +79,76 @@ class InterferenceAnalysis(Analysis):
         res.close()
     
     # Private Methods
-    def __prepare_graph(self,g):
-        h = csr_matrix(g)
-        for i in range(g.shape[0]):
-            idx = h[i,:].nonzero()[1]
-            h[i,idx] = 2**np.arange(len(idx))
-        return h
-
-    def __bfs(self,X,Y, limit, h):
-        fringe = np.zeros((h.shape[0],))
-        seen = np.zeros((h.shape[0],))
-        fringe[X] = 1
-        seen[X] = -1
-        for _ in range(limit):
-            step = h.dot(fringe)
-            new = (step > 0) & (seen == 0)
-            fringe[new] = 1
-            seen[new] = step[new]
-            if new[Y].any():
-                break
-        found = seen[Y] > 0
-        if not found.any():
-            return None
-        cur = Y[found.nonzero()[0][0]]
-        path = []
-        while cur not in X:
-            nextport = ((self.bits & np.int64(seen[cur])) > 0).nonzero()[0][0]
-            next = h[cur,:].indices[nextport]
-            path.append((cur, next))
-            cur = next
-        return path
-
-    def __c_XY(self,X,Y, limit, h):
-        g = h.tocsr(copy=True)
-        res = np.zeros((limit+1,), dtype=np.int32)
-        while True:
-            p = self.__bfs(X,Y, limit, g)
-            if not p: break
-            res[len(p):] += 1
-            for s,t in p:
-                g[s,t] = 0
-                g[t,s] = 0
-        return res
-
-    def __interference_analysis(self, g, limit, collectc, collectx, count = 1000):
+    def __interference_analysis(self, g, limit, collectc, collectx, count = 1000, ci=None, cache=None, connectivity=None, stream=None):
         r = list(range(0, g.edge))
-        if self.all_combinations:
-            pairs = list(permutations(r, 4))
-        else:
-            pairs = [random.sample(r, 4) for _ in range(0, count)]
-
-        h = self.__prepare_graph(g)
-
-        def doall(abcd):
-            a,b,c,d = abcd
-            c_ab = self.__c_XY([a], [b], limit, h)
-            c_cd = self.__c_XY([c], [d], limit, h)
-            c_acb = self.__c_XY([a,c], [b], limit, h)
-            c_acd = self.__c_XY([a,c], [d], limit, h)
-            c_acbd = self.__c_XY([a,c], [b,d], limit, h)
-            return c_ab, c_cd, c_acb, c_acd, c_acbd
-
-        out = pmap(doall, pairs)
-
-        for (a,b,c,d), (c_ab, c_cd, c_acb, c_acd, c_acbd) in zip(pairs, out):
+        h = ResidualGraph(g)
+        cache = cache or ConnectivityCache()
+
+        bounds = None if connectivity is None else (lambda X, Y: bound(connectivity, X, Y))
+
+        def doall(chunk):
+            return search_chunk(h, chunk, limit, bounds)
+
+        def search(queries):
+            return search_parallel(h, queries, limit, bounds)
+
+        def quadruples(n):
+            # all of them even on vertex-transitive topologies, the greedy c_l breaks ties
+            # by router id and is not invariant under their automorphisms
+            if self.all_combinations:
+                return list(permutations(r, 4))
+            return [random.sample(r, 4) for _ in range(0, n)]
+
+        def interference(pairs, search, collectc, collectx):
+            # quadruples share pairs (and sets), every distinct query is searched once
+            queries = []
+            for a,b,c,d in pairs:
+                queries += [([a], [b]), ([c], [d]), ([a,c], [b]), ([a,c], [d]), ([a,c], [b,d])]
+            found = cache.resolve(queries, limit, search)
+            # c_ab, c_cd, c_acb, c_acd, c_acbd of the quadruples
+            c_ab, c_cd, c_acb, c_acd, c_acbd = (np.array(found[j::5], dtype=np.int64).reshape(-1, limit+1) for j in range(5))
+            x = c_acb + c_acd - c_acbd
+
+            # aggregated runs do not store the routers
+            a, b, c, d = np.array(pairs, dtype=np.int64).reshape(-1, 4).T
+            ab, cd, abcd = ({}, {}, {}) if self.aggregate else ({'a': a, 'b': b}, {'a': c, 'b': d}, {'a': a, 'b': b, 'c': c, 'd': d})
+            # one batch of rows per length
             for i in range(1, limit+1):
-                collectc(len=i, a=a, b=b, c_ab=c_ab[i])
-                collectc(len=i, a=c, b=d, c_ab=c_cd[i])
-                collectx(len=i, a=a, b=b, c=c, d=d, x_abcd=c_acb[i]+c_acd[i]-c_acbd[i], c_abcd=c_acbd[i], c_acd=c_acd[i], c_acb=c_acb[i], c_ab=c_ab[i], c_cd=c_cd[i])
+                collectc.many(len=i, **ab, c_ab=c_ab[:, i])
+                collectc.many(len=i, **cd, c_ab=c_cd[:, i])
+                collectx.many(len=i, **abcd, x_abcd=x[:, i], c_abcd=c_acbd[:, i], c_acd=c_acd[:, i], c_acb=c_acb[:, i], c_ab=c_ab[:, i], c_cd=c_cd[:, i])
+            # plotted: the interference of the quadruples for every path length
+            return [(i, x[:, i]) for i in range(1, limit+1)]
+
+        def batch(n):
+            return interference(quadruples(n), search, collectc, collectx)
+
+        def streamed(n):
+            # the children sample, search and store the quadruples of their chunks in
+            # their own shards (committed per chunk), only the plotted counts return
+            pairs = quadruples(0) if self.all_combinations else None
+            seed = random.getrandbits(64)
+            shards = []
+
+            def work(start, end):
+                if not shards: # first chunk of this child
+                    shards.extend(stream.shard(collect, getpid()) for collect in (collectc, collectx))
+                # a generator per chunk, the forked children share the parent's state
+                sample = random.Random(seed + start)
+                chunk = pairs[start:end] if pairs is not None else [sample.sample(r, 4) for _ in range(start, end)]
+                hits = cache.hits
+                quantities = interference(chunk, doall, *shards)
+                for shard in shards:
+                    shard.results.commit()
+                return [(i, *np.unique(x, return_counts=True)) for i, x in quantities], cache.hits - hits, 5 * len(chunk)
+
+            counts = {i: Counter() for i in range(1, limit+1)}
+            # chunks of lanes quadruples: 5 lane batches of queries per commit
+            for _, (quantities, hits, queries) in forall(len(pairs) if pairs is not None else n, work, chunksize=lanes):
+                for i, values, found in quantities:
+                    counts[i].update(dict(zip(values.tolist(), found.tolist())))
+                cache.hits += hits
+                cache.queries += queries
+            return [(i, list(c.keys()), list(c.values())) for i, c in counts.items()]
+
+        return run_adaptive(streamed if stream else batch, count, ci, batch=self.batch)
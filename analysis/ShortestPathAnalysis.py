@@ -8,107 +8,307 @@
 
 from .Analysis import Analysis
 from .results import Results
-from .common import is_in_db
+from .common import is_in_db, sample_pairs, covers_all_pairs, representative_weight, multiplicity_runs
+from .symmetry import representatives
+from .oracles import has_oracle, distribution
+from .adaptive import run_adaptive
 from .simplepmap import pmap
+from .powerpool import SparsePowerPool
+from .bfs import count_bfs, group_by_source
+from .semiring import matmul, Counter, count_workspace
+from . import outofcore
+from tempfile import TemporaryDirectory
 from topogen.common import from_list_graph_to_matrix_graph, from_list_graph_to_sparse_matrix
-from itertools import permutations
 import numpy as np
 import scipy.sparse as ss
-import random
 
 
 class ShortestPathAnalysis(Analysis):
-    edgetype = edgetype = np.uint32
-
-    def __init__(self, datafilename="shortest_paths.db", number_of_samples=1000000, all_combinations=False):
+    def __init__(self, datafilename="shortest_paths.db", number_of_samples=1000000, all_combinations=False, batch_size=10000):
         super(ShortestPathAnalysis,self).__init__()
         self.datafile = self.datafilefolder + datafilename
         self.number_of_samples = number_of_samples
+        self.batch = batch_size
         self.all_combinations = all_combinations
 
-    def analyse(self, networks, maxlength : int, sparse=False, parallel=False):
+    def analyse(self, networks, maxlength : int, sparse=False, parallel=False, engine='matrix', backend='numpy', mem_budget=None, scratch=None, maxmultiplicity=None, oracle=True, ci=None, aggregate=False):
         res = Results(self.datafile)
+        # multiplicities are saturated at this value (None: exact counts)
+        self.maxmultiplicity = maxmultiplicity
+        # aggregate: one weighted row per (len, multiplicity) instead of one row per pair
+        self.aggregate = aggregate
+        collector = res.aggregator if aggregate else res.collector
+
+        # workers of the parallel sparse matrix powers are forked once for all networks
+        pool = None
+        if parallel and sparse and engine in ('matrix', 'rows'):
+            pool = SparsePowerPool()
 
         for network in networks:          
 
             print("Analysing shortest paths on %s with %d endnodes" %(network.name,network.N))
-            if not is_in_db(network,res,maxlength):
+            if not is_in_db(network,res,maxlength,multiplicity_runs(res, maxmultiplicity)):
                 
-                if sparse: 
+                # closed-form distributions do not need the graph at all
+                use_oracle = oracle and has_oracle(network)
+                # every vertex-transitive topology uses the pairs of a representative router,
+                # the closed forms hold without the check of the graph
+                if use_oracle:
+                    sources = np.array([0]) if network.vertex_transitive else None
+                else:
+                    sources = representatives(network)
+                exact = covers_all_pairs(network.edge, self.number_of_samples, self.all_combinations, sources)
+                weight = representative_weight(network.edge, exact, sources)
+                if ci and not exact and not use_oracle and engine not in ('bfs', 'rows'):
+                    print("     --> adaptive sampling (--ci) is only supported by the bfs and rows engines, using %d samples" % self.number_of_samples)
+                if use_oracle:
+                    collect = collector(file="shortest_paths.py", tag="shortest-path", maxlen = maxlength, len=Results.Int, multiplicity=Results.Int, maxmultiplicity=maxmultiplicity, exact=int(exact), oracle=1, topo=network.name, n_r=network.R, r=network.nr, n_e=network.N, p=network.p) 
+                    self.__sample_oracle(network=network, limit=maxlength, collect=collect, count=self.number_of_samples, exact=exact, equivalent=weight)
+                elif engine == 'bfs':
+                    sparse_matrix_graph = from_list_graph_to_sparse_matrix(network.get_topo())
+                    sparse_matrix_graph.edge = network.edge
+                    sparse_matrix_graph.vertices = network.R
+                    collect = collector(file="shortest_paths.py", tag="shortest-path", maxlen = maxlength, len=Results.Int, multiplicity=Results.Int, maxmultiplicity=maxmultiplicity, exact=int(exact), topo=network.name, n_r=network.R, r=network.nr, n_e=network.N, p=network.p) 
+                    estimate = self.__count_shortest_paths_bfs(graph=sparse_matrix_graph, limit=maxlength, collect=collect, count=self.number_of_samples, sources=sources, parallel=parallel, ci=None if exact else ci)
+                    if ci and not exact:
+                        res.update_run(collect, ci=ci, ci_error=estimate.error(), samples=estimate.n)
+                elif engine == 'rows':
+                    if sparse:
+                        graph = from_list_graph_to_sparse_matrix(network.get_topo())
+                    else:
+                        graph = np.asarray(from_list_graph_to_matrix_graph(network.get_topo(), dtype=np.uint32))
+                    collect = collector(file="shortest_paths.py", tag="shortest-path", maxlen = maxlength, len=Results.Int, multiplicity=Results.Int, maxmultiplicity=maxmultiplicity, exact=int(exact), topo=network.name, n_r=network.R, r=network.nr, n_e=network.N, p=network.p) 
+                    estimate = self.__count_shortest_paths_rows(graph=graph, edge=network.edge, limit=maxlength, collect=collect, count=self.number_of_samples, sources=sources, pool=pool, backend=backend, ci=None if exact else ci)
+                    if ci and not exact:
+                        res.update_run(collect, ci=ci, ci_error=estimate.error(), samples=estimate.n)
+                elif mem_budget and not sparse:
+                    collect = collector(file="shortest_paths.py", tag="shortest-path", maxlen = maxlength, len=Results.Int, multiplicity=Results.Int, maxmultiplicity=maxmultiplicity, exact=int(exact), topo=network.name, n_r=network.R, r=network.nr, n_e=network.N, p=network.p) 
+                    self.__count_shortest_paths_outofcore(list_graph=network.get_topo(), edge=network.edge, limit=maxlength, collect=collect, count=self.number_of_samples, sources=sources, budget=mem_budget, scratch=scratch, backend=backend)
+                elif sparse: 
                     sparse_matrix_graph = from_list_graph_to_sparse_matrix(network.get_topo())
                     sparse_matrix_graph.edge = network.edge
                     sparse_matrix_graph.vertices = network.R
-                    collect = res.collector(file="shortest_paths.py", tag="shortest-path", maxlen = maxlength, len=Results.Int, multiplicity=Results.Int, topo=network.name, n_r=network.R, r=network.nr, n_e=network.N, p=network.p) 
-                    self.__count_shortest_paths_sparse(graph=sparse_matrix_graph, limit=maxlength, collect=collect, count=self.number_of_samples, parallel=parallel)
-                    res.commit()
+                    collect = collector(file="shortest_paths.py", tag="shortest-path", maxlen = maxlength, len=Results.Int, multiplicity=Results.Int, maxmultiplicity=maxmultiplicity, exact=int(exact), topo=network.name, n_r=network.R, r=network.nr, n_e=network.N, p=network.p) 
+                    self.__count_shortest_paths_sparse(graph=sparse_matrix_graph, limit=maxlength, collect=collect, count=self.number_of_samples, sources=sources, pool=pool)
                 else:
                     matrix_graph = from_list_graph_to_matrix_graph(network.get_topo())
                     matrix_graph.edge = network.edge
                     matrix_graph.vertices = network.R
-                    collect = res.collector(file="shortest_paths.py", tag="shortest-path", maxlen = maxlength, len=Results.Int, multiplicity=Results.Int, topo=network.name, n_r=network.R, r=network.nr, n_e=network.N, p=network.p) 
-                    self.__count_shortest_paths(graph=matrix_graph, limit=maxlength, collect=collect, count=self.number_of_samples)
-                    res.commit()
+                    collect = collector(file="shortest_paths.py", tag="shortest-path", maxlen = maxlength, len=Results.Int, multiplicity=Results.Int, maxmultiplicity=maxmultiplicity, exact=int(exact), topo=network.name, n_r=network.R, r=network.nr, n_e=network.N, p=network.p) 
+                    self.__count_shortest_paths(graph=matrix_graph, limit=maxlength, collect=collect, count=self.number_of_samples, sources=sources, backend=backend)
+
+                # the rows of a representative stand for the pairs of weight routers
+                if weight > 1:
+                    res.reweight(collect, weight)
+                res.commit()
 
             else:
                 print("     --> skip, already in database")
 
+        if pool:
+            pool.close()
         res.close()
     
     # private methods
-    def __count_shortest_paths_sparse(self, graph, limit, collect, count=100000, parallel=False):
-        r = list(range(0, graph.edge))
-        if self.all_combinations:
-            pairs = list(permutations(r, 2))
+    def __sample_oracle(self, network, limit, collect, count=100000, exact=False, equivalent=1):
+        length, multiplicity, pairs = distribution(network)
+
+        # SQLite integers are signed 64 bit
+        cap = self.maxmultiplicity or np.iinfo(np.int64).max
+        multiplicity = np.array([min(m, cap) for m in multiplicity], dtype=np.int64)
+
+        if self.aggregate:
+            # the weights are the exact pair counts (of one of the equivalent routers,
+            # reweighted by the caller) or the counts of count samples
+            if exact:
+                weight = pairs // equivalent
+            else:
+                total = network.edge * (network.edge - 1)
+                weight = np.random.default_rng().multinomial(count, (pairs / total).astype(np.float64))
+            keep = (length <= limit) & (weight > 0)
+            collect.many(len=length[keep], multiplicity=multiplicity[keep], weight=weight[keep])
+            return
+
+        if exact:
+            rows = np.repeat(np.arange(len(length)), (pairs // equivalent).astype(np.int64))
         else:
-            pairs = [random.sample(r, 2) for _ in range(0, count)]
+            total = network.edge * (network.edge - 1)
+            rows = np.random.default_rng().choice(len(length), size=count, p=(pairs / total).astype(np.float64))
+        rows = rows[length[rows] <= limit]
+        collect.many(len=length[rows], multiplicity=multiplicity[rows])
+
+    def __count_shortest_paths_bfs(self, graph, limit, collect, count=100000, sources=None, parallel=False, ci=None):
+        def batch(n):
+            s, t = sample_pairs(graph.edge, n, self.all_combinations, sources=sources)
+            roots, groups = group_by_source(s, t)
+
+            # one counting BFS per distinct source instead of powers of the whole matrix
+            def doall(i):
+                dist, mult = count_bfs(graph, roots[i], limit, cap=self.maxmultiplicity)
+                targets = t[groups[i]]
+                return dist[targets], mult[targets]
+
+            if parallel:
+                out = pmap(doall, list(range(len(roots))))
+            else:
+                out = map(doall, range(len(roots)))
+
+            length = np.zeros(len(s), dtype=np.int64)
+            multiplicity = np.zeros(len(s), dtype=np.uint64)
+            for pairs, (dist, mult) in zip(groups, out):
+                reached = dist > 0
+                collect.many(len=dist[reached], multiplicity=mult[reached])
+                length[pairs[reached]] = dist[reached]
+                multiplicity[pairs[reached]] = mult[reached]
+            return self.__quantities(length, multiplicity)
+
+        return run_adaptive(batch, count, ci, batch=self.batch)
+
+    def __count_shortest_paths_sparse(self, graph, limit, collect, count=100000, sources=None, pool=None):
+        s, t = sample_pairs(graph.edge, count, self.all_combinations, sources=sources)
         
-        acc = ss.identity(graph.vertices, dtype=self.edgetype, format='csr')
-        is_shortest = np.ones(count, dtype=np.bool)
+        if pool:
+            pool.load(graph, np.arange(graph.vertices), s, t, cap=self.maxmultiplicity)
+        else:
+            counter = Counter(graph.sum(axis=1).max(), self.maxmultiplicity)
+            acc = ss.identity(graph.vertices, dtype=counter.dtype, format='csr')
+            adjacency = graph.astype(counter.dtype)
+        unresolved = np.ones(len(s), dtype=np.bool_)
 
         for i in range(1, limit+1):
+            if not unresolved.any():
+                break
             
-            if parallel:
-                step = self.__pmult(acc,graph)
+            if pool:
+                values = pool.step()[unresolved]
             else:
-                step = acc.dot(graph)
-                
-            for index, pair in enumerate(pairs):
-                s = pair[0]
-                t = pair[1]
-                if is_shortest[index] and step[s,t]:
-                    collect(len=i, multiplicity=step[s,t])
-                    is_shortest[index] = False
+                acc = counter.prepare(acc)
+                # the adjacency is cast again only when the counter widens
+                if adjacency.dtype != counter.dtype:
+                    adjacency = graph.astype(counter.dtype)
+                acc = counter.saturate(acc.dot(adjacency))
+                values = np.asarray(acc[s[unresolved], t[unresolved]]).ravel()
 
-            acc = step
+            self.__collect_reached(i, values, unresolved, collect)
 
-    def __count_shortest_paths(self, graph, limit, collect, count = 100000):
-        r = list(range(0, graph.edge))
-        if self.all_combinations:
-            pairs = list(permutations(r, 2))
-        else:
-            pairs = [random.sample(r, 2) for _ in range(0, count)]
+    def __count_shortest_paths(self, graph, limit, collect, count = 100000, sources=None, backend='numpy'):
+        s, t = sample_pairs(graph.edge, count, self.all_combinations, sources=sources)
         
-        acc = np.identity(graph.vertices, dtype=self.edgetype)
-        connected = np.zeros_like(graph, dtype=np.bool_)
+        counter = Counter(graph.sum(axis=1).max(), self.maxmultiplicity)
+        adjacency = np.asarray(graph, dtype=counter.dtype)
+        acc = np.identity(graph.vertices, dtype=counter.dtype)
+        unresolved = np.ones(len(s), dtype=np.bool_)
 
         for i in range(1, limit+1):
-            step = acc.dot(graph)
-                
-            shortest = np.multiply(step, ~connected) # elem-wise mask
-            connected += (step != 0)
-            
-            for s,t in pairs:
-                if shortest[s,t]:
-                    collect(len=i, multiplicity=step[s,t])
+            if not unresolved.any():
+                break
+
+            acc = counter.prepare(acc)
+            step = matmul(acc, adjacency, semiring='count', backend=backend, dtype=counter.dtype)
+            if ss.issparse(step):
+                step = step.toarray()
+            step = counter.saturate(step)
+
+            values = step[s[unresolved], t[unresolved]]
+            self.__collect_reached(i, values, unresolved, collect)
 
             acc = step
-    
-    def __pmult(self, A, B):
-        A = A.asformat("csr")
-        BS = 1000 
-        nblocks = int(A.shape[0] / BS)
-        aa = [A[i*BS:(i+1)*BS, :] for i in range(0, nblocks)]
-        if nblocks*BS < A.shape[0]:
-            aa.append(A[nblocks*BS:, :])
-        qs = pmap(lambda a: a*B, aa)
-        return ss.vstack(qs)
+
+    def __count_shortest_paths_outofcore(self, list_graph, edge, limit, collect, count=100000, sources=None, budget=1<<30, scratch=None, backend='numpy'):
+        s, t = sample_pairs(edge, count, self.all_combinations, sources=sources)
+
+        # entries of the l-th power are bounded by maxdeg^l, the type is fixed for all files
+        maxdeg = max(len(row) for row in list_graph)
+        counter = Counter(maxdeg, self.maxmultiplicity)
+        dtype = counter.fit(min(maxdeg ** (limit-1), counter.cap or maxdeg ** limit))
+        n = len(list_graph)
+        print("     --> out-of-core %s powers, %d x %d tiles" %(np.dtype(dtype).name, *(2*[outofcore.tile_size(n, budget, np.dtype(dtype).itemsize, count_workspace(backend, dtype))])))
+
+        with TemporaryDirectory(dir=scratch) as tmp:
+            adjacency = outofcore.adjacency(list_graph, tmp, dtype=counter.narrowest(maxdeg))
+            acc = adjacency
+            buffers = []
+            unresolved = np.ones(len(s), dtype=np.bool_)
+
+            for i in range(1, limit+1):
+                if not unresolved.any():
+                    break
+
+                if i > 1:
+                    # acc and step alternate between two scratch files
+                    if not buffers:
+                        buffers = [outofcore.empty(tmp, name, (n, n), dtype) for name in ["acc", "step"]]
+                    step = buffers[1] if acc is buffers[0] else buffers[0]
+                    acc = outofcore.tiled_matmul(acc, adjacency, step, budget, backend=backend, dtype=dtype, cap=counter.cap)
+
+                values = np.asarray(acc[s[unresolved], t[unresolved]])
+                self.__collect_reached(i, values, unresolved, collect)
+
+    def __count_shortest_paths_rows(self, graph, edge, limit, collect, count=100000, sources=None, pool=None, backend='numpy', ci=None):
+        def batch(n):
+            s, t = sample_pairs(edge, n, self.all_combinations, sources=sources)
+            found = (np.zeros(len(s), dtype=np.int64), np.zeros(len(s), dtype=np.uint64))
+            self.__rows_batch(graph, s, t, limit, collect, pool, backend, found)
+            return self.__quantities(*found)
+
+        return run_adaptive(batch, count, ci, batch=self.batch)
+
+    def __rows_batch(self, graph, s, t, limit, collect, pool=None, backend='numpy', found=None):
+        # only the S rows of the distinct sources are propagated (S x R slab)
+        sources, row = np.unique(s, return_inverse=True)
+        counter = Counter(graph.sum(axis=1).max(), self.maxmultiplicity)
+        if pool:
+            pool.load(graph, sources, row, t, cap=self.maxmultiplicity)
+        elif ss.issparse(graph):
+            acc = ss.csr_matrix((np.ones(len(sources), dtype=counter.dtype), (np.arange(len(sources)), sources)), shape=(len(sources), graph.shape[0]))
+            adjacency = graph.astype(counter.dtype)
+        else:
+            acc = np.zeros((len(sources), graph.shape[0]), dtype=counter.dtype)
+            acc[np.arange(len(sources)), sources] = 1
+        unresolved = np.ones(len(s), dtype=np.bool_)
+
+        for i in range(1, limit+1):
+            if not unresolved.any():
+                break
+
+            if pool:
+                # the workers keep their fixed row blocks across all lengths
+                self.__collect_reached(i, pool.step()[unresolved], unresolved, collect, found)
+                continue
+
+            acc = counter.prepare(acc)
+            if not ss.issparse(graph):
+                step = matmul(acc, graph, semiring='count', backend=backend, dtype=counter.dtype)
+            else:
+                # the adjacency is cast again only when the counter widens
+                if adjacency.dtype != counter.dtype:
+                    adjacency = graph.astype(counter.dtype)
+                step = acc.dot(adjacency)
+            step = counter.saturate(step)
+
+            values = step[row[unresolved], t[unresolved]]
+            if ss.issparse(step):
+                values = np.asarray(values).ravel()
+            self.__collect_reached(i, values, unresolved, collect, found)
+
+            # drop the rows of sources whose pairs are all resolved
+            live = np.zeros(step.shape[0], dtype=np.bool_)
+            live[row[unresolved]] = True
+            row = (np.cumsum(live) - 1)[row]
+            acc = step[live]
+
+    # values holds step[s,t] of the unresolved pairs, the non-zero ones have their
+    # shortest paths at this length and are written with one bulk insert
+    def __collect_reached(self, length, values, unresolved, collect, found=None):
+        reached = values != 0
+        collect.many(len=np.full(np.count_nonzero(reached), length), multiplicity=values[reached])
+        pairs = np.flatnonzero(unresolved)[reached]
+        unresolved[pairs] = False
+        if found:
+            found[0][pairs] = length
+            found[1][pairs] = values[reached]
+
+    # quantities of the plots for adaptive sampling: length of the shortest paths
+    # (0 if longer than maxlength) and the multiplicity up to the plotted maximum
+    def __quantities(self, length, multiplicity):
+        return [('len', length), ('multiplicity', np.minimum(multiplicity, self.maxmultiplicity or 5))]
@@ -7,7 +7,7 @@
 # Main author: Jascha Krattenmacher
 
 from .Plotter import Plotter
-from .common import make_topos, find_runs
+from .common import make_topos, find_runs, weight_column, multiplicity_runs
 from .ShortestPathAnalysis import ShortestPathAnalysis
 from .results import Results, pyplot 
 
@@ -25,7 +25,7 @@ class ShortestPathPlotter(Plotter):
      
         res = Results(sh_analysis.datafile)
 
-        runids = find_runs(networks,res,"shortest-path", maxlength)
+        runids = find_runs(networks,res,"shortest-path", maxlength, multiplicity_runs(res))
         runids = "(" + ", ".join(str(x) for x in runids) + ")"
 
         runwhere = "runid in " + runids
@@ -41,25 +41,26 @@ class ShortestPathPlotter(Plotter):
                 class_distinction += ' when n_e < %d then %d' %(classes[i+1],classes[i])
             class_distinction += ' else %d end '  %(classes[len(classes) - 1])
 
-        select = 'len, case when topo like "JF-%" then substr(topo, 4) else topo end,' +class_distinction+ ', case when topo like "JF-%" then "eq. JF" else "base" end'
+        select = 'len, case when topo like "JF-%" then substr(topo, 4) else topo end,' +class_distinction+ ', case when topo like "JF-%" then "eq. JF" else "base" end, ' + weight_column(res)
 
         where= 'len <=' + str(maxlength)
 
         if size is None:
             size = str((0.5+0.5*jellyfish+len(topos))*2.25) +"x" + str((1.5 + jellyfish)*2.25)
 
-        pyplot(outfile=outfile, size=size, manual=False, datafile=sh_analysis.datafile, select=select, runwhere=runwhere, where=where, plotType = 'shortestpath_length', density=density, maxlength=maxlength, label='shortest path length $l_{min} \leq ' + str(maxlength) + '$', sqlLength=4, jellyfish=jellyfish, classes=classes)
+        pyplot(outfile=outfile, size=size, manual=False, datafile=sh_analysis.datafile, select=select, runwhere=runwhere, where=where, plotType = 'shortestpath_length', density=density, maxlength=maxlength, label='shortest path length $l_{min} \leq ' + str(maxlength) + '$', sqlLength=5, jellyfish=jellyfish, classes=classes)
 
     def plot_shortestpath_multiplicity(self, topos : [str], classes : [int], maxlength : int, maxmultiplicity : int, jellyfish : bool, outfile = "plot.pdf", size = None, density=False):
         networks = make_topos(topos,classes,jellyfish)
         
         sh_analysis = ShortestPathAnalysis()
-        sh_analysis.analyse(networks=networks, maxlength=maxlength, sparse=False)
+        # runs saturated at maxmultiplicity or above are exact for this plot
+        sh_analysis.analyse(networks=networks, maxlength=maxlength, sparse=False, maxmultiplicity=maxmultiplicity)
         self.plotted_topologies_info(outfile,networks)
 
         res = Results(sh_analysis.datafile)
 
-        runids = find_runs(networks,res,"shortest-path", maxlength)
+        runids = find_runs(networks,res,"shortest-path", maxlength, multiplicity_runs(res, maxmultiplicity))
         runids = "(" + ", ".join(str(x) for x in runids) + ")"
 
         runwhere = "runid in " + runids
@@ -85,9 +86,9 @@ class ShortestPathPlotter(Plotter):
         
         label += ", where $l_{min} \leq " + str(maxlength) + "$"
 
-        select = 'min(multiplicity, '+ str(maxmultiplicity) +'), case when topo like "JF-%" then substr(topo, 4) else topo end, case when topo like "JF-%" then "eq. JF" else "base" end,' + class_distinction
+        select = 'min(multiplicity, '+ str(maxmultiplicity) +'), case when topo like "JF-%" then substr(topo, 4) else topo end, case when topo like "JF-%" then "eq. JF" else "base" end,' + class_distinction + ', ' + weight_column(res)
         where= 'len <=' + str(maxlength)
 
         if size is None:
             size = str((0.5+0.5*jellyfish+len(topos))*2.25) +"x" + str((1.5 + jellyfish)*2.25)
-        pyplot(outfile=outfile, size=size, manual=False, datafile=sh_analysis.datafile, select=select, runwhere=runwhere, where=where, plotType='shortestpath_multiplicity', density=density, maxlength=maxlength, maxmultiplicity=maxmultiplicity, label='shortest path multiplicity $n_{min}$' + label, sqlLength=4, jellyfish=jellyfish, classes=classes)
+        pyplot(outfile=outfile, size=size, manual=False, datafile=sh_analysis.datafile, select=select, runwhere=runwhere, where=where, plotType='shortestpath_multiplicity', density=density, maxlength=maxlength, maxmultiplicity=maxmultiplicity, label='shortest path multiplicity $n_{min}$' + label, sqlLength=5, jellyfish=jellyfish, classes=classes)
@@ -0,0 +1,22 @@
+# Copyright (c) 2025 ETH Zurich.
+#                    All rights reserved.
+#
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+# Length-bounded greedy count of vertex-disjoint paths c_l(a,b): paths share no
+# routers but a and b, i.e. the diversity that survives router failures. Same
+# sampling, batching and options as the edge-disjoint analysis, the residual
+# graph blocks the inner routers of the paths (implicit node splitting).
+
+from .EdgeDisjointPathAnalysis import EdgeDisjointPathAnalyis
+
+
+class VertexDisjointPathAnalysis(EdgeDisjointPathAnalyis):
+    vertex_disjoint = True
+    description = "vertex disjoint paths"
+    tag = "vertex-connectivity"
+    databases = []
+
+    def __init__(self, datafilename="vertex_disjoint_paths.db", number_of_samples=1000, all_combinations=False, batch_size=100):
+        super(VertexDisjointPathAnalysis,self).__init__(datafilename, number_of_samples, all_combinations, batch_size)
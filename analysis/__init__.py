@@ -1,6 +1,9 @@
 from .ShortestPathAnalysis import ShortestPathAnalysis
 from .EdgeDisjointPathAnalysis import EdgeDisjointPathAnalyis
+from .VertexDisjointPathAnalysis import VertexDisjointPathAnalysis
 from .InterferenceAnalysis import InterferenceAnalysis
+from .DistanceAnalysis import DistanceAnalysis
+from .EdgeConnectivityAnalysis import EdgeConnectivityAnalysis
 
 from .ShortestPathPlotter import ShortestPathPlotter
 from .EdgeDisjointPathPlotter import EdgeDisjointPathPlotter
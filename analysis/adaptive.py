@@ -0,0 +1,62 @@
+# Copyright (c) 2025 ETH Zurich.
+#                    All rights reserved.
+#
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+# Adaptive sampling: samples are processed in batches until the confidence
+# intervals of the plotted fractions (e.g. the share of pairs with shortest path
+# length l) are narrower than a given half-width, or the sample budget is spent.
+
+from collections import defaultdict
+import numpy as np
+
+
+class Estimate:
+    """
+    Running histograms of categorical quantities. Every sample has one value per
+    quantity, the fractions of all values get normal-approximation confidence
+    intervals. Values never seen are bounded by the rule of three (3/n).
+    """
+    def __init__(self, z=1.96):
+        self.z = z
+        self.n = 0
+        self.counts = defaultdict(int)
+
+    def add(self, quantities, n):
+        """
+        quantities: list of (name, values) with one value per sample of the batch,
+        or (name, values, counts) with the distinct values and their counts.
+        """
+        self.n += n
+        for name, values, *counts in quantities:
+            counts = counts[0] if counts else None
+            if counts is None:
+                values, counts = np.unique(values, return_counts=True)
+            for value, count in zip(values, counts):
+                self.counts[(name, value)] += int(count)
+
+    def error(self):
+        """
+        Largest half-width of the confidence intervals of all fractions.
+        """
+        if self.n == 0:
+            return float('inf')
+        p = np.array(list(self.counts.values()), dtype=np.float64) / self.n
+        return max(self.z * np.sqrt(p * (1 - p) / self.n).max(initial=0), 3 / self.n)
+
+def run_adaptive(process, count, ci=None, batch=1000):
+    """
+    Calls process(n), which handles n new samples and returns their quantities (see
+    Estimate.add), until the error is at most ci or count samples are processed.
+    Without ci, all count samples are processed in one batch.
+    """
+    estimate = Estimate()
+    if not ci:
+        batch = count
+    while estimate.n < count:
+        n = min(batch, count - estimate.n)
+        estimate.add(process(n), n)
+        if ci and estimate.error() <= ci:
+            break
+    return estimate
@@ -9,18 +9,27 @@
 from .InterferenceAnalysis import InterferenceAnalysis
 from .ShortestPathAnalysis import ShortestPathAnalysis
 from .EdgeDisjointPathAnalysis import EdgeDisjointPathAnalyis
+from .VertexDisjointPathAnalysis import VertexDisjointPathAnalysis
+from .DistanceAnalysis import DistanceAnalysis
+from .EdgeConnectivityAnalysis import EdgeConnectivityAnalysis
 from .common import make_topos
 from os import makedirs, path
 
 
-def analyse(topos: [str], classes: [int], jellyfish: bool, maxlength: int, analyse_function, parallel=False, sparse=False, lowmemory=False):
+def analyse(topos: [str], classes: [int], jellyfish: bool, maxlength: int, analyse_function, parallel=False, sparse=False, lowmemory=False, engine='matrix', backend='numpy', mem_budget=None, scratch=None, maxmultiplicity=None, oracle=True, ci=None, aggregate=False, reuse=False, prune=False, factor=None, stream=False):
     networks = make_topos(topos, classes, jellyfish)
 
     if analyse_function == 'shortestpaths':
-        ShortestPathAnalysis().analyse(networks=networks, maxlength=maxlength, sparse=sparse, parallel=parallel)
+        ShortestPathAnalysis().analyse(networks=networks, maxlength=maxlength, sparse=sparse, parallel=parallel, engine=engine, backend=backend, mem_budget=mem_budget, scratch=scratch, maxmultiplicity=maxmultiplicity, oracle=oracle, ci=ci, aggregate=aggregate)
     elif analyse_function == 'disjointpaths':
-        EdgeDisjointPathAnalyis().analyse(networks=networks, maxlength=maxlength)
+        EdgeDisjointPathAnalyis().analyse(networks=networks, maxlength=maxlength, ci=ci, aggregate=aggregate, reuse=reuse, prune=prune, factor=factor)
+    elif analyse_function == 'vertexdisjoint':
+        VertexDisjointPathAnalysis().analyse(networks=networks, maxlength=maxlength, ci=ci, aggregate=aggregate, reuse=reuse, prune=prune, factor=factor)
     elif analyse_function == 'interference':
-        InterferenceAnalysis().analyse(networks=networks, maxlength=maxlength)
+        InterferenceAnalysis().analyse(networks=networks, maxlength=maxlength, ci=ci, aggregate=aggregate, reuse=reuse, prune=prune, stream=stream)
+    elif analyse_function == 'distances':
+        DistanceAnalysis().analyse(networks=networks, maxlength=maxlength, parallel=parallel)
+    elif analyse_function == 'edgeconnectivity':
+        EdgeConnectivityAnalysis().analyse(networks=networks, aggregate=aggregate)
     else:
         raise Exception('invalid analysis')
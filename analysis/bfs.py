@@ -0,0 +1,121 @@
+# Copyright (c) 2025 ETH Zurich.
+#                    All rights reserved.
+#
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+# BFS kernels on CSR adjacency (indptr, indices, data as in scipy.sparse.csr_matrix)
+
+import numpy as np
+
+
+def expand(indptr, frontier):
+    """
+    Returns the ids of all CSR entries (edges) leaving the vertices in frontier
+    and, for each of these edges, the position of its tail in frontier.
+    """
+    starts = indptr[frontier]
+    degrees = indptr[frontier + 1] - starts
+    total = int(degrees.sum())
+    owner = np.repeat(np.arange(len(frontier)), degrees)
+    offsets = np.arange(total) - np.repeat(np.cumsum(degrees) - degrees, degrees)
+    return starts[owner] + offsets, owner
+
+def count_bfs(graph, source, limit, dtype=np.uint64, cap=None):
+    """
+    Counting BFS from source up to limit hops.
+
+    Returns (dist, mult) where dist[v] is the hop distance from source to v (-1 if
+    not reached within limit) and mult[v] is the number of shortest paths (walks of
+    length dist[v]) from source to v. Parallel edges are counted by their weight in
+    graph.data, so the result equals the first non-zero entry of the matrix powers.
+    With a cap, multiplicities are saturated at cap (exact for min(mult, cap)).
+    """
+    n = graph.shape[0]
+    dist = np.full(n, -1, dtype=np.int32)
+    mult = np.zeros(n, dtype=dtype)
+    dist[source] = 0
+    mult[source] = 1
+    frontier = np.array([source], dtype=graph.indices.dtype)
+
+    for length in range(1, limit+1):
+        edges, owner = expand(graph.indptr, frontier)
+        targets = graph.indices[edges]
+        new = dist[targets] == -1
+        if not new.any():
+            break
+        targets = targets[new]
+        contrib = mult[frontier][owner[new]] * graph.data[edges[new]].astype(dtype)
+
+        # sum contributions per target without going through float (np.bincount)
+        order = np.argsort(targets, kind='stable')
+        targets = targets[order]
+        frontier, first = np.unique(targets, return_index=True)
+        mult[frontier] = np.add.reduceat(contrib[order], first)
+        if cap:
+            mult[frontier] = np.minimum(mult[frontier], cap)
+        dist[frontier] = length
+
+    return dist, mult
+
+def group_by_source(s, t):
+    """
+    Groups pairs (s[i], t[i]) by source. Returns the distinct sources and, for each
+    of them, the indices of its pairs.
+    """
+    s = np.asarray(s)
+    order = np.argsort(s, kind='stable')
+    sources, first = np.unique(s[order], return_index=True)
+    return sources, np.split(order, first[1:])
+
+def bitparallel_bfs(graph, sources, targets, limit, chunk_edges=1 << 22):
+    """
+    Multi-source BFS: source i owns bit i%64 of word i//64, so one sweep over the
+    CSR neighbour lists advances the frontiers of all sources at once.
+
+    Returns (counts, ecc): counts[l] is the number of (source, target) pairs at
+    distance l (targets given as boolean mask), ecc[i] is the largest distance
+    reached from sources[i] (over all vertices, bounded by limit).
+    """
+    n = graph.shape[0]
+    words = (len(sources) + 63) // 64
+    indptr = graph.indptr
+    indices = graph.indices
+
+    visited = np.zeros((n, words), dtype=np.uint64)
+    lane = np.arange(len(sources))
+    visited[sources, lane // 64] |= np.left_shift(np.uint64(1), (lane % 64).astype(np.uint64))
+    frontier = visited.copy()
+
+    # split rows into chunks of bounded edge count to limit the size of gathered frontiers
+    bounds = [0]
+    while bounds[-1] < n:
+        bounds.append(max(bounds[-1] + 1, int(np.searchsorted(indptr, indptr[bounds[-1]] + chunk_edges, side='right')) - 1))
+    bounds[-1] = n
+
+    counts = [0]
+    ecc = np.zeros(len(sources), dtype=np.int32)
+    shifts = np.arange(64, dtype=np.uint64)
+    length = 0
+    while limit is None or length < limit:
+        length += 1
+        reached = np.zeros_like(frontier)
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            rows = np.arange(a, b)
+            nonempty = rows[indptr[a+1:b+1] > indptr[a:b]]
+            if len(nonempty) == 0:
+                continue
+            gathered = frontier[indices[indptr[a]:indptr[b]]]
+            reached[nonempty] = np.bitwise_or.reduceat(gathered, indptr[nonempty] - indptr[a], axis=0)
+        new = reached & ~visited
+        if not new.any():
+            break
+        visited |= new
+        frontier = new
+
+        counts.append(int(np.bitwise_count(new[targets]).sum()))
+        active = np.bitwise_or.reduce(new, axis=0)
+        bits = ((active[:, None] >> shifts) & np.uint64(1)).astype(bool).ravel()[:len(sources)]
+        ecc[bits] = length
+
+    return np.array(counts, dtype=np.int64), ecc
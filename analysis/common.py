@@ -6,9 +6,12 @@
 #
 # Main author: Alessandro Maissen
 
-from .results import Results
+from .results import Results, growtable
 import topogen
 from topogen import toponames
+import numpy as np
+import scipy.sparse as ss
+from hashlib import sha1
 
 
 # creates a list of topologies given classes and names
@@ -24,22 +27,77 @@ def make_topos(topos : [str], classes : [int], jellyfish : bool):
                 networks.append(toponames[topo](N=c))
     return networks
 
-def is_in_db(topo, results : Results, maxLength : int):
-    if next(results.conn.execute("SELECT COUNT(*) from runs;"))[0]:
-        # not an empty database
-        count = results.conn.execute("SELECT COUNT(*) FROM runs WHERE runs.topo LIKE '%s' AND n_r = %d AND runs.n_e = %d AND runs.r = %d AND runs.maxlen >= %d;" %(topo.name, topo.R, topo.N, topo.nr, maxLength))
-        return next(count)[0]
+# returns arrays (s, t) of ordered pairs of distinct routers in range(n), either
+# count uniformly sampled ones or all n*(n-1) in the order of itertools.permutations.
+# With sources (representatives of a vertex-transitive topology, see symmetry.py)
+# only pairs of these sources are used, all of them if there are at most count.
+def sample_pairs(n : int, count : int, all_combinations=False, rng=None, sources=None):
+    if sources is not None and covers_all_pairs(n, count, all_combinations, sources):
+        s = np.repeat(sources, n-1)
+        t = np.tile(np.arange(n-1), len(sources))
+    elif sources is not None:
+        if rng is None:
+            rng = np.random.default_rng()
+        s = rng.choice(sources, size=count)
+        t = rng.integers(0, n-1, size=count)
+    elif all_combinations:
+        s = np.repeat(np.arange(n), n-1)
+        t = np.tile(np.arange(n-1), n)
     else:
-        return 0
+        if rng is None:
+            rng = np.random.default_rng()
+        s = rng.integers(0, n, size=count)
+        t = rng.integers(0, n-1, size=count)
+    t += t >= s
+    return s, t
 
-def find_runs(networks, results : Results, tag, maxlength):
+# True if sample_pairs returns all pairs (up to automorphisms), i.e. the results are exact
+def covers_all_pairs(n : int, count : int, all_combinations=False, sources=None):
+    if sources is not None:
+        return all_combinations or len(sources) * (n-1) <= count
+    return all_combinations
+
+# rows of an exact run from representative sources stand for the pairs of this
+# many routers each (see Results.reweight)
+def representative_weight(n : int, exact, sources=None):
+    return n // len(sources) if exact and sources is not None else 1
+
+# identifies the router graph (e.g. of a random topology) independent of its parameters
+def fingerprint(graph):
+    graph = ss.csr_matrix(graph, dtype=np.int64)
+    graph.sum_duplicates()
+    graph.sort_indices()
+    return sha1(b"".join(np.ascontiguousarray(a, dtype=np.int64).tobytes() for a in (graph.indptr, graph.indices, graph.data))).hexdigest()[:16]
+
+# runs of the network with at least maxLength (runwhere: further SQL conditions on the runs)
+def is_in_db(topo, results : Results, maxLength : int, runwhere = None):
+    return results.lookup("SELECT COUNT(*) FROM runs WHERE topo = ? AND n_r = ? AND n_e = ? AND r = ? AND maxlen >= ?%s;" % (" AND " + runwhere if runwhere else ""),
+                          (topo.name, int(topo.R), int(topo.N), int(topo.nr), int(maxLength)))[0][0]
+
+def find_runs(networks, results : Results, tag, maxlength, runwhere = None):
     runids = []
     for network in networks:
-        runid = results.conn.execute("SELECT runid FROM runs WHERE runs.topo LIKE '%s' AND n_r = %d AND runs.n_e = %d AND runs.r = %d AND runs.tag LIKE '%s' AND runs.maxlen >= %d ORDER BY runs.maxlen ASC;" %(network.name, network.R, network.N, network.nr, tag, maxlength))
-        runids.append(next(runid)[0])
+        runid = results.lookup("SELECT runid FROM runs WHERE topo = ? AND n_r = ? AND n_e = ? AND r = ? AND tag = ? AND maxlen >= ?%s ORDER BY maxlen ASC;" % (" AND " + runwhere if runwhere else ""),
+                               (network.name, int(network.R), int(network.N), int(network.nr), tag, int(maxlength)))
+        runids.append(runid[0][0])
 
     return runids
 
+# runs of EdgeDisjointPathAnalyis with all pairs with c_l <= factor*r stored (all pairs without factor)
+def factor_runs(results : Results, factor = None):
+    growtable(results.conn, 'runs', {'factor': Results.Any})
+    return "runs.factor IS NULL" if factor is None else "(runs.factor IS NULL OR runs.factor >= %r)" % factor
+
+# runs of ShortestPathAnalysis with multiplicities exact up to maxmultiplicity (exact ones without)
+def multiplicity_runs(results : Results, maxmultiplicity = None):
+    growtable(results.conn, 'runs', {'maxmultiplicity': Results.Any})
+    return "runs.maxmultiplicity IS NULL" if maxmultiplicity is None else "(runs.maxmultiplicity IS NULL OR runs.maxmultiplicity >= %d)" % maxmultiplicity
+
+def weight_column(results : Results):
+    # rows of aggregated runs (Results.aggregator) stand for `weight` samples each
+    columns = [d[0].lower() for d in results.conn.execute("SELECT * FROM datapoints LIMIT 1;").description]
+    return "coalesce(weight, 1)" if "weight" in columns else "1"
+
 def getinfo(topos : [str], classes : [int], jellyfish : bool):
     f=open("sizes.info","w+")
     f.write("name r p N R \n")
@@ -0,0 +1,115 @@
+# Copyright (c) 2025 ETH Zurich.
+#                    All rights reserved.
+#
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+# Gomory-Hu (flow equivalent) tree of the router graph, built with Gusfield's
+# algorithm from R-1 maximum flows instead of one flow per pair.
+#
+# The edge connectivity lambda(a,b) of every pair is the smallest weight on the
+# tree path between a and b. Links have capacity 1 (parallel links count as one,
+# as in ResidualGraph), so lambda(a,b) bounds the number of edge-disjoint paths
+# between a and b of any length, in particular the greedy c_l(a,b).
+
+import numpy as np
+import scipy.sparse as ss
+from scipy.sparse.csgraph import maximum_flow, breadth_first_order
+
+
+class GomoryHuTree:
+    def __init__(self, graph):
+        """
+        graph: symmetric adjacency matrix (dense or scipy.sparse).
+        """
+        capacity = ss.csr_matrix(graph, dtype=np.int32)
+        capacity.setdiag(0)
+        capacity.eliminate_zeros()
+        capacity.data[:] = 1
+        self.n = capacity.shape[0]
+        # vertex v hangs below parent[v] < v with an edge of weight[v]
+        self.parent = np.zeros(self.n, dtype=np.int64)
+        self.weight = np.zeros(self.n, dtype=np.int64)
+
+        for s in range(1, self.n):
+            t = self.parent[s]
+            flow = maximum_flow(capacity, s, t)
+            self.weight[s] = flow.flow_value
+            # source side of the minimum cut: reachable from s in the residual graph
+            residual = ss.csr_matrix(capacity - flow.flow)
+            residual.data = (residual.data > 0).astype(np.int32)
+            residual.eliminate_zeros()
+            side = np.zeros(self.n, dtype=np.bool_)
+            side[breadth_first_order(residual, s, directed=True, return_predecessors=False)] = True
+            later = np.arange(s + 1, self.n)
+            self.parent[later[side[later] & (self.parent[later] == t)]] = s
+
+    def matrix(self, vertices=None):
+        """
+        lambda(a,b) for all pairs of vertices (default: all vertices), the diagonal
+        is 0. Tree edges are merged by decreasing weight, two vertices are
+        connected by the weight of the edge that joins their components.
+        """
+        vertices = np.arange(self.n) if vertices is None else np.asarray(vertices)
+        position = np.full(self.n, -1, dtype=np.int64)
+        position[vertices] = np.arange(len(vertices))
+        out = np.zeros((len(vertices), len(vertices)), dtype=np.int32)
+
+        component = np.arange(self.n)
+        members = {v: ([position[v]] if position[v] >= 0 else []) for v in range(self.n)}
+        for v in np.argsort(-self.weight[1:], kind='stable') + 1:
+            a, b = component[v], component[self.parent[v]]
+            if len(members[a]) < len(members[b]):
+                a, b = b, a
+            if members[a] and members[b]:
+                out[np.ix_(members[a], members[b])] = self.weight[v]
+                out[np.ix_(members[b], members[a])] = self.weight[v]
+            # b is merged into a
+            component[component == b] = a
+            members[a] += members.pop(b)
+        return out
+
+def bound(connectivity, X, Y):
+    """
+    Upper bound on the edge-disjoint paths from the set X to the set Y given the
+    lambda matrix of GomoryHuTree.matrix: the union of the minimum cuts of all
+    pairs separates X from Y.
+    """
+    return int(connectivity[np.ix_(X, Y)].sum())
+
+def validate_gomoryhu():
+    # lambda of all pairs from the tree against one maximum flow per pair
+    from topogen import toponames
+    from topogen.common import from_list_graph_to_sparse_matrix
+
+    # two K_8 joined by three links and a path hanging off the second one
+    bridged = [[j for j in range(8) if j != i] for i in range(8)] + [[j for j in range(8, 16) if j != i] for i in range(8, 16)] + [[15, 17], [16]]
+    for i in range(3):
+        bridged[i].append(8 + i)
+        bridged[8 + i].append(i)
+    bridged[15].append(16)
+
+    cases = [("%s with %d routers" % (network.name, network.R), network.get_topo()) for network in
+             [toponames['SF'](q=5), toponames['DF'](p=2), toponames['FT'](k=4), toponames['HX2'](s=4)]]
+    cases.append(("two bridged K_8", bridged))
+    results = []
+    for name, list_graph in cases:
+        print("--> Validating Gomory-Hu tree of %s:" % name)
+        graph = from_list_graph_to_sparse_matrix(list_graph)
+        tree = GomoryHuTree(graph)
+        found = tree.matrix()
+        capacity = ss.csr_matrix(graph, dtype=np.int32)
+        capacity.data[:] = 1
+        expected = np.zeros_like(found)
+        for a in range(tree.n):
+            for b in range(a + 1, tree.n):
+                expected[a, b] = expected[b, a] = maximum_flow(capacity, a, b).flow_value
+        passed = np.array_equal(found, expected)
+        if not passed:
+            print("     --> Gomory-Hu tree error: connectivity differs from the maximum flows")
+        results.append(passed)
+
+    if all(results):
+        print("VALIDATION PASSED")
+    else:
+        print("VALIDATION NOT PASSED")
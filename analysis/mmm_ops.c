@@ -19,6 +19,8 @@
 #include "numpy/ndarrayobject.h"
 
 #ifdef MMM_OP_NAME
+/* out = a (x) b over the semiring (REDUCE, OP) with neutral element ZERO,
+ * for a (m x k), b (k x n) and out (m x n), all C-contiguous of type NPY_TYPE. */
 static PyObject *
 MMM_OP_NAME(PyObject *dummy, PyObject *args)
 {
@@ -32,45 +34,55 @@ MMM_OP_NAME(PyObject *dummy, PyObject *args)
     if (arr1 == NULL) return NULL;
     arr2 = (PyArrayObject*) PyArray_FROM_OTF(arg2, NPY_TYPE, NPY_ARRAY_IN_ARRAY);
     if (arr2 == NULL) goto fail;
-    oarr = (PyArrayObject*) PyArray_FROM_OTF(aout, NPY_TYPE, NPY_ARRAY_INOUT_ARRAY);
+    oarr = (PyArrayObject*) PyArray_FROM_OTF(aout, NPY_TYPE, NPY_ARRAY_INOUT_ARRAY2);
     if (oarr == NULL) goto fail;
     
-    if (PyArray_NDIM(arr1) != 2 || PyArray_NDIM(arr2) != 2 || PyArray_NDIM(oarr) != 2)
+    if (PyArray_NDIM(arr1) != 2 || PyArray_NDIM(arr2) != 2 || PyArray_NDIM(oarr) != 2) {
+        PyErr_SetString(PyExc_ValueError, "expected 2-dimensional arrays");
         goto fail;
+    }
     
-    int n = PyArray_DIM(oarr, 0);
-    if (PyArray_DIM(oarr, 0) != n || PyArray_DIM(oarr, 1) != n
-     || PyArray_DIM(arr1, 0) != n || PyArray_DIM(arr1, 1) != n
-     || PyArray_DIM(arr2, 0) != n || PyArray_DIM(arr2, 1) != n)
+    npy_intp m = PyArray_DIM(arr1, 0);
+    npy_intp k = PyArray_DIM(arr1, 1);
+    npy_intp n = PyArray_DIM(arr2, 1);
+    if (PyArray_DIM(arr2, 0) != k || PyArray_DIM(oarr, 0) != m || PyArray_DIM(oarr, 1) != n) {
+        PyErr_SetString(PyExc_ValueError, "shape mismatch");
         goto fail;
+    }
         
     CTYPE* a = (CTYPE*) PyArray_DATA(arr1);
     CTYPE* b = (CTYPE*) PyArray_DATA(arr2);
     CTYPE* out = (CTYPE*) PyArray_DATA(oarr);
     
-    for (int i = 0; i < n*n; i++) {
-        out[i] = 0;
+    for (npy_intp i = 0; i < m*n; i++) {
+        out[i] = ZERO;
     }
             
-    int BS = 128;
+    const npy_intp BS = 128;
     
-    #pragma omp parallel for
-    for (int by = 0; by < n+BS-1; by += BS) {
-        for (int bx = 0; bx < n+BS-1; bx += BS) {
-            for (int bk = 0; bk < n+BS-1; bk += BS) {
-                for (int y = by; y < by+BS && y < n; y++) {
-                    for (int x = bx; x < bx+BS && x < n; x++) {
-                        CTYPE acc = 0;
-                        for(int k = bk; k < bk+BS && k < n; k++) {
-                            acc += OP(a[k + n*y], b[x + n*k]);
+    Py_BEGIN_ALLOW_THREADS
+    #pragma omp parallel for schedule(dynamic)
+    for (npy_intp by = 0; by < m; by += BS) {
+        for (npy_intp bk = 0; bk < k; bk += BS) {
+            for (npy_intp bx = 0; bx < n; bx += BS) {
+                for (npy_intp y = by; y < by+BS && y < m; y++) {
+                    for (npy_intp z = bk; z < bk+BS && z < k; z++) {
+                        CTYPE av = a[z + k*y];
+#ifdef ABSORBING
+                        /* ZERO is absorbing for OP, the term does not change out */
+                        if (av == ZERO) continue;
+#endif
+                        for (npy_intp x = bx; x < bx+BS && x < n; x++) {
+                            out[x + n*y] = REDUCE(out[x + n*y], OP(av, b[x + n*z]));
                         }
-                        out[x + n*y] += acc;
                     }
                 }
             }
         }
     }
+    Py_END_ALLOW_THREADS
 
+    PyArray_ResolveWritebackIfCopy(oarr);
     Py_DECREF(arr1);
     Py_DECREF(arr2);
     Py_DECREF(oarr);
@@ -80,15 +92,22 @@ MMM_OP_NAME(PyObject *dummy, PyObject *args)
  fail:
     Py_XDECREF(arr1);
     Py_XDECREF(arr2);
-    PyArray_DiscardWritebackIfCopy(oarr);
+    if (oarr != NULL) PyArray_DiscardWritebackIfCopy(oarr);
     Py_XDECREF(oarr);
     return NULL;
 }
 
 #else
 
+#define ADD(a, b) ((a) + (b))
+#define MIN(a, b) (((a) < (b)) ? (a) : (b))
+#define ABSORBING
+
+/* float64 kernels */
 #define NPY_TYPE NPY_FLOAT64
 #define CTYPE double
+#define ZERO 0
+#define REDUCE ADD
 
 #define MMM_OP_NAME mmm_op_mult
 #define OP(a, b)  ((a) * (b))
@@ -96,17 +115,123 @@ MMM_OP_NAME(PyObject *dummy, PyObject *args)
 #undef OP
 #undef MMM_OP_NAME
 
+#undef ABSORBING
 #define MMM_OP_NAME mmm_op_min
-#define OP(a, b)  (((a) < (b)) ? (a) : (b))
+#define OP MIN
 #include "mmm_ops.c"
 #undef OP
 #undef MMM_OP_NAME
+#define ABSORBING
+
+#undef REDUCE
+#undef ZERO
+#undef CTYPE
+#undef NPY_TYPE
+
+/* (+, x) counting semiring */
+#define ZERO 0
+#define REDUCE ADD
+#define OP(a, b)  ((a) * (b))
+
+#define NPY_TYPE NPY_UINT8
+#define CTYPE npy_uint8
+#define MMM_OP_NAME mmm_op_count_uint8
+#include "mmm_ops.c"
+#undef MMM_OP_NAME
+#undef CTYPE
+#undef NPY_TYPE
+
+#define NPY_TYPE NPY_UINT16
+#define CTYPE npy_uint16
+#define MMM_OP_NAME mmm_op_count_uint16
+#include "mmm_ops.c"
+#undef MMM_OP_NAME
+#undef CTYPE
+#undef NPY_TYPE
+
+#define NPY_TYPE NPY_UINT32
+#define CTYPE npy_uint32
+#define MMM_OP_NAME mmm_op_count_uint32
+#include "mmm_ops.c"
+#undef MMM_OP_NAME
+#undef CTYPE
+#undef NPY_TYPE
+
+#define NPY_TYPE NPY_UINT64
+#define CTYPE npy_uint64
+#define MMM_OP_NAME mmm_op_count_uint64
+#include "mmm_ops.c"
+#undef MMM_OP_NAME
+#undef CTYPE
+#undef NPY_TYPE
+
+#undef OP
+#undef REDUCE
+#undef ZERO
+
+/* (min, +) distance semiring, the largest value of the type encodes infinity */
+#define REDUCE MIN
+
+#define NPY_TYPE NPY_UINT8
+#define CTYPE npy_uint8
+#define ZERO NPY_MAX_UINT8
+#define OP(a, b)  (((a) >= ZERO - (b)) ? ZERO : (CTYPE) ((a) + (b)))
+#define MMM_OP_NAME mmm_op_distance_uint8
+#include "mmm_ops.c"
+#undef MMM_OP_NAME
+#undef OP
+#undef ZERO
+#undef CTYPE
+#undef NPY_TYPE
+
+#define NPY_TYPE NPY_UINT16
+#define CTYPE npy_uint16
+#define ZERO NPY_MAX_UINT16
+#define OP(a, b)  (((a) >= ZERO - (b)) ? ZERO : (CTYPE) ((a) + (b)))
+#define MMM_OP_NAME mmm_op_distance_uint16
+#include "mmm_ops.c"
+#undef MMM_OP_NAME
+#undef OP
+#undef ZERO
+#undef CTYPE
+#undef NPY_TYPE
+
+#undef REDUCE
+
+/* (or, and) reachability semiring */
+#define NPY_TYPE NPY_UINT8
+#define CTYPE npy_uint8
+#define ZERO 0
+#define REDUCE(a, b) ((a) | (b))
+#define OP(a, b)  ((a) & (b))
+#define MMM_OP_NAME mmm_op_reach_uint8
+#include "mmm_ops.c"
+#undef MMM_OP_NAME
+#undef OP
+#undef REDUCE
+#undef ZERO
+#undef CTYPE
+#undef NPY_TYPE
 
 static PyMethodDef mmm_ops_Methods[] = {
     {"mmm_mult",  mmm_op_mult, METH_VARARGS,
      "Normal Matrix-Matrix Multiplication with multiplication"},
     {"mmm_min",  mmm_op_min, METH_VARARGS,
      "Matrix-Matrix Multiplication with min(x,y) instead of x*y"},
+    {"mmm_count_uint8",  mmm_op_count_uint8, METH_VARARGS,
+     "(+, x) Matrix-Matrix Multiplication on uint8"},
+    {"mmm_count_uint16",  mmm_op_count_uint16, METH_VARARGS,
+     "(+, x) Matrix-Matrix Multiplication on uint16"},
+    {"mmm_count_uint32",  mmm_op_count_uint32, METH_VARARGS,
+     "(+, x) Matrix-Matrix Multiplication on uint32"},
+    {"mmm_count_uint64",  mmm_op_count_uint64, METH_VARARGS,
+     "(+, x) Matrix-Matrix Multiplication on uint64"},
+    {"mmm_distance_uint8",  mmm_op_distance_uint8, METH_VARARGS,
+     "(min, +) Matrix-Matrix Multiplication on uint8, 255 is infinity"},
+    {"mmm_distance_uint16",  mmm_op_distance_uint16, METH_VARARGS,
+     "(min, +) Matrix-Matrix Multiplication on uint16, 65535 is infinity"},
+    {"mmm_reach_uint8",  mmm_op_reach_uint8, METH_VARARGS,
+     "(or, and) Matrix-Matrix Multiplication on uint8 (0/1)"},
     {NULL, NULL, 0, NULL}        /* Sentinel */
 };
 
@@ -0,0 +1,140 @@
+# Copyright (c) 2025 ETH Zurich.
+#                    All rights reserved.
+#
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+# Closed-form shortest path statistics keyed by Topology.name.
+#
+# An oracle returns the exact distribution of (length, multiplicity) over all
+# ordered pairs of distinct routers with endpoints, without generating the graph.
+#
+# Product topologies (HC, tori, HyperX, flattened butterflies): a uniform pair of
+# routers is a uniform pair of coordinates in every dimension, lengths add up and
+# the multiplicity of a pair with per-dimension distances d_i and multiplicities
+# m_i is the multinomial (sum d_i)! / prod d_i! times prod m_i.
+# Trees (k-ary n-trees, FatTree): one term per level of the lowest common ancestor.
+
+from collections import defaultdict
+from fractions import Fraction
+from math import factorial
+import numpy as np
+
+
+def product(dimensions):
+    """
+    dimensions: per dimension a list of (distance, multiplicity, coordinate pairs).
+    Returns {(length, multiplicity): ordered router pairs} including the pairs (v, v).
+    """
+    states = {(0, Fraction(1)): 1}
+    for terms in dimensions:
+        new = defaultdict(int)
+        for (length, weight), pairs in states.items():
+            for d, m, count in terms:
+                new[(length + d, weight * Fraction(m, factorial(d)))] += pairs * count
+        states = new
+    out = defaultdict(int)
+    for (length, weight), pairs in states.items():
+        out[(length, int(factorial(length) * weight))] += pairs
+    return out
+
+def complete(s):
+    # a dimension of s routers with all-to-all links
+    return [(0, 1, s), (1, 1, s*(s-1))]
+
+def ring(k):
+    terms = defaultdict(int)
+    for delta in range(k):
+        d = min(delta, k - delta)
+        terms[(d, 2 if 0 < d and 2*d == k else 1)] += k
+    return [(d, m, count) for (d, m), count in terms.items()]
+
+def hypercube(network):
+    return product([complete(2)] * network.n)
+
+def torus(network):
+    return product([ring(network.k)] * network.n)
+
+def hyperx(network):
+    return product([complete(network.s)] * network.l)
+
+def flatbutterfly(network):
+    return product([complete(network.k)] * (network.n - 1))
+
+def karyn(network):
+    # leaves whose coordinates first differ at level n-1-h meet h levels up,
+    # every up-link of the path can be chosen freely (k choices)
+    k, n = network.k, network.n
+    out = {(0, 1): k**(n-1)}
+    for h in range(1, n):
+        out[(2*h, k**h)] = k**(n-1) * (k-1) * k**(h-1)
+    return out
+
+def fattree(network):
+    # k pods of k/2 edge routers: 2 hops over the k/2 aggregation routers of the
+    # own pod, 4 hops over k/2 aggregation times k/2 core routers otherwise
+    p = network.k // 2
+    return {(0, 1): network.edge, (2, p): network.edge * (p-1), (4, p*p): network.edge * (2*p-1) * p}
+
+oracles = {
+    'HC': hypercube,
+    'KNT': karyn,
+    'FT': fattree,
+    'FT2x': fattree,
+}
+oracles.update({'%dDTorus' % n: torus for n in range(2, 7)})
+oracles.update({'HX%d' % l: hyperx for l in range(1, 7)})
+oracles.update({'%dDFB' % n: flatbutterfly for n in range(1, 7)})
+
+def has_oracle(network):
+    return network.name in oracles
+
+def distribution(network):
+    """
+    Returns arrays (length, multiplicity, pairs): the number of ordered pairs of
+    distinct routers with endpoints for every (length, multiplicity). Multiplicities
+    are Python integers (object arrays), they may exceed 64 bit.
+    """
+    out = oracles[network.name](network)
+    keys = sorted(k for k in out if k[0] > 0)
+    length = np.array([k[0] for k in keys], dtype=np.int64)
+    multiplicity = np.array([k[1] for k in keys], dtype=object)
+    pairs = np.array([out[k] for k in keys], dtype=object)
+    return length, multiplicity, pairs
+
+def cross_check(network):
+    """
+    Compares the oracle with counting BFS from every router with endpoints of the
+    generated graph.
+    """
+    from .bfs import count_bfs
+    from topogen.common import from_list_graph_to_sparse_matrix
+
+    graph = from_list_graph_to_sparse_matrix(network.get_topo())
+    found = defaultdict(int)
+    for source in range(network.edge):
+        dist, mult = count_bfs(graph, source, graph.shape[0])
+        targets = np.flatnonzero(np.arange(network.edge) != source)
+        for d, m in zip(dist[targets], mult[targets]):
+            found[(int(d), int(m))] += 1
+    length, multiplicity, pairs = distribution(network)
+    expected = {(int(l), int(m)): int(c) for l, m, c in zip(length, multiplicity, pairs)}
+    return dict(found) == expected
+
+def validate_oracles():
+    from topogen import toponames
+
+    networks = [toponames['HC'](n=5), toponames['3DTorus'](k=4), toponames['3DTorus'](k=5), toponames['HX2'](s=4),
+                toponames['HX3'](s=3), toponames['2DFB'](k=4), toponames['KARY3'](k=3), toponames['KARY4'](k=2), toponames['FT'](k=6)]
+    results = []
+    for network in networks:
+        print("--> Validating oracle of %s with %d routers:" % (network.name, network.R))
+        passed = cross_check(network)
+        if not passed:
+            print("     --> oracle error: distribution differs from the generated graph")
+        results.append(passed)
+
+    if all(results):
+        print("VALIDATION PASSED")
+    else:
+        print("VALIDATION NOT PASSED")
@@ -0,0 +1,70 @@
+# Copyright (c) 2025 ETH Zurich.
+#                    All rights reserved.
+#
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+# Out-of-core dense matrices: R x R operands are np.memmap files on a scratch
+# directory and products are streamed tile by tile so that only a few T x T
+# tiles (bounded by a memory budget) are resident at a time.
+
+import numpy as np
+import scipy.sparse as ss
+from math import isqrt
+from os import path
+from .semiring import matmul, count_workspace
+
+units = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+
+def parse_size(size : str) -> int:
+    """
+    Parses a size like 512M, 8G or 1073741824 (bytes) into bytes.
+    """
+    size = size.strip().upper().rstrip('B')
+    unit = size[-1:] if size[-1:] in units else ''
+    try:
+        return int(float(size[:len(size)-len(unit)]) * units[unit])
+    except ValueError:
+        raise ValueError('invalid size: %s' % size)
+
+def tile_size(n : int, budget : int, itemsize : int, workspace : int = 0) -> int:
+    # resident: one tile of each operand, the output tile and the partial product,
+    # plus workspace bytes per entry of the backend (see semiring.count_workspace)
+    return max(1, min(n, isqrt(budget // (4 * itemsize + workspace))))
+
+def empty(scratch : str, name : str, shape, dtype):
+    return np.memmap(path.join(scratch, name), dtype=dtype, mode='w+', shape=shape)
+
+def adjacency(list_graph : [[int]], scratch : str, dtype=np.uint8):
+    """
+    Writes the adjacency matrix of list_graph (parallel edges counted) to a memmap
+    row by row, without materializing a dense in-memory copy.
+    """
+    n = len(list_graph)
+    a = empty(scratch, "adjacency", (n, n), dtype)
+    for i, row in enumerate(list_graph):
+        np.add.at(a[i], np.asarray(row, dtype=np.intp), 1)
+    a.flush()
+    return a
+
+def tiled_matmul(a, b, out, budget : int, backend='numpy', dtype=None, cap=None):
+    """
+    out = a * b (counting semiring) over T x T tiles, with T chosen such that the
+    resident tiles fit into budget bytes. a, b and out may be memmaps. With a
+    cap, the entries of out are saturated at cap.
+    """
+    dtype = dtype or out.dtype
+    m, k = a.shape
+    n = b.shape[1]
+    t = tile_size(max(m, k, n), budget, np.dtype(dtype).itemsize, count_workspace(backend, dtype))
+    for i in range(0, m, t):
+        for j in range(0, n, t):
+            tile = np.zeros((min(t, m-i), min(t, n-j)), dtype=dtype)
+            for l in range(0, k, t):
+                product = matmul(a[i:i+t, l:l+t], b[l:l+t, j:j+t], semiring='count', backend=backend, dtype=dtype)
+                tile += product.toarray() if ss.issparse(product) else product
+            if cap:
+                np.minimum(tile, cap, out=tile)
+            out[i:i+t, j:j+t] = tile
+    out.flush()
+    return out
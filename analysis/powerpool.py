@@ -0,0 +1,161 @@
+# Copyright (c) 2025 ETH Zurich.
+#                    All rights reserved.
+#
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+# Persistent worker pool for sparse matrix powers acc_{l+1} = acc_l * graph.
+#
+# compared to pmap on row blocks at every length, this pool
+# - forks once and can be reused for many graphs
+# - receives the right-hand CSR matrix once through shared memory
+# - keeps the row blocks of acc inside the workers across all lengths
+# - writes only the requested entries acc[s,t] into a shared output buffer,
+#   so no CSR block is pickled or stacked
+
+from os import fork, _exit, getenv, waitpid
+from multiprocessing import cpu_count, Pipe
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing import resource_tracker
+from traceback import format_exc
+import numpy as np
+import scipy.sparse as ss
+from .semiring import Counter
+
+
+def share(array):
+    shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+def attach(descriptor):
+    name, shape, dtype = descriptor
+    # the parent owns the segment and unregisters it from the (shared) tracker on unlink
+    shm = SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+class SparsePowerPool:
+    def __init__(self, nprocs=None):
+        self.nprocs = nprocs or int(getenv("NPROCS", cpu_count()))
+        self.workers = []
+        self.shared = []
+        # started before forking, so that all workers share the tracker of the parent
+        resource_tracker.ensure_running()
+        for i in range(self.nprocs):
+            parent, child = Pipe()
+            pid = fork()
+            if pid == 0: # child
+                parent.close()
+                try:
+                    self.__serve(i, child)
+                finally:
+                    _exit(0)
+            # parent
+            child.close()
+            self.workers.append((pid, parent))
+
+    def load(self, graph, sources, row, t, cap=None):
+        """
+        Prepares the powers of the rows `sources` of graph (identity slab) and the
+        lookup of the entries (row[i], t[i]) of each power. Every worker widens the
+        counters of its own block as needed (semiring.Counter), saturated at cap.
+        """
+        self.unload()
+        graph = graph.tocsr()
+        maxdeg = graph.sum(axis=1).max()
+        arrays = [graph.indptr, graph.indices, graph.data, np.asarray(sources), np.asarray(row), np.asarray(t), np.zeros(len(t), dtype=np.uint64)]
+        descriptors = []
+        for array in arrays:
+            shm, descriptor = share(array)
+            self.shared.append(shm)
+            descriptors.append(descriptor)
+        self.values = np.ndarray(len(t), dtype=np.uint64, buffer=self.shared[-1].buf)
+        self.__broadcast(("load", graph.shape, maxdeg, cap, descriptors))
+
+    def step(self):
+        """
+        Multiplies every row block with graph and returns acc[row, t] (shared buffer).
+        """
+        self.__broadcast(("step",))
+        return self.values.copy()
+
+    def unload(self):
+        if self.shared:
+            self.__broadcast(("unload",))
+            self.values = None
+            for shm in self.shared:
+                shm.close()
+                shm.unlink()
+            self.shared = []
+
+    def close(self):
+        self.unload()
+        self.__broadcast(("exit",))
+        for pid, conn in self.workers:
+            waitpid(pid, 0)
+            conn.close()
+        self.workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # private methods
+    def __broadcast(self, message):
+        for _, conn in self.workers:
+            conn.send(message)
+        fail = []
+        for _, conn in self.workers:
+            reply = conn.recv()
+            if reply is not None:
+                fail.append(reply)
+        if fail:
+            raise Exception("SparsePowerPool worker failed:\n" + fail[0])
+
+    def __serve(self, i, conn):
+        shared = []
+        state = {}
+        while True:
+            message = conn.recv()
+            try:
+                if message[0] == "load":
+                    _, shape, maxdeg, cap, descriptors = message
+                    attached = [attach(d) for d in descriptors]
+                    shared = [shm for shm, _ in attached]
+                    indptr, indices, data, sources, row, t, values = [a for _, a in attached]
+
+                    # fixed block of the slab rows owned by this worker
+                    lo = i * len(sources) // self.nprocs
+                    hi = (i+1) * len(sources) // self.nprocs
+                    mine = np.flatnonzero((row >= lo) & (row < hi))
+                    counter = Counter(maxdeg, cap)
+                    state = {
+                        'counter': counter,
+                        'graph': ss.csr_matrix((data, indices, indptr), shape=shape),
+                        'acc': ss.csr_matrix((np.ones(hi-lo, dtype=counter.dtype), (np.arange(hi-lo), sources[lo:hi])), shape=(hi-lo, shape[0])),
+                        'mine': mine,
+                        'row': row[mine] - lo,
+                        't': t[mine],
+                        'values': values,
+                    }
+                    del attached, indptr, indices, data, sources, row, t, values
+                elif message[0] == "step":
+                    counter = state['counter']
+                    acc = counter.prepare(state['acc'])
+                    state['acc'] = counter.saturate(acc.dot(state['graph'].astype(counter.dtype, copy=False)))
+                    if len(state['mine']):
+                        state['values'][state['mine']] = np.asarray(state['acc'][state['row'], state['t']]).ravel()
+                elif message[0] == "unload":
+                    state = {}
+                    for shm in shared:
+                        shm.close()
+                    shared = []
+                elif message[0] == "exit":
+                    conn.send(None)
+                    return
+                conn.send(None)
+            except:
+                conn.send(format_exc())
@@ -0,0 +1,373 @@
+# Copyright (c) 2025 ETH Zurich.
+#                    All rights reserved.
+#
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+# Residual graph for the length-bounded greedy Ford-Fulkerson of the edge-disjoint
+# path, vertex-disjoint path and interference analyses.
+#
+# The graph is kept as flat CSR arrays with an `alive` flag per directed edge.
+# Augmenting paths are found with a frontier-based BFS, their edges (both
+# directions) are switched off and switched on again after every c_XY, so no
+# matrix is copied or structurally modified per pair.
+#
+# Vertex-disjoint paths split every router implicitly into an in- and an
+# out-copy joined by an edge of capacity 1: as the greedy search never uses
+# reverse edges, using that edge is the same as blocking the inner routers of a
+# path, so they get a `blocked` flag instead of a doubled graph.
+
+import numpy as np
+import scipy.sparse as ss
+import sqlite3
+from collections import OrderedDict
+from os import path
+from .bfs import expand
+from .simplepmap import pmap_into
+
+# queries per batch of c_XY_many (bits of a uint64 mask)
+lanes = 64
+
+# result files (in Analysis.datafilefolder) with connectivity runs, see ConnectivityCache.load
+connectivity_databases = ["edge_disjoint_paths.db", "interference.db", "low_connectivity.db"]
+
+
+class ResidualGraph:
+    def __init__(self, graph, vertex_disjoint=False):
+        """
+        graph: symmetric adjacency matrix (dense or scipy.sparse), parallel edges
+        count as one edge. vertex_disjoint: paths share no routers but their ends.
+        """
+        self.vertex_disjoint = vertex_disjoint
+        graph = ss.csr_matrix(graph)
+        graph.sum_duplicates()
+        graph.eliminate_zeros()
+        graph.sort_indices()
+        self.n = graph.shape[0]
+        self.indptr = graph.indptr.astype(np.int64)
+        self.indices = graph.indices.astype(np.int64)
+        self.tails = np.repeat(np.arange(self.n), np.diff(self.indptr))
+
+        # twin[e] is the edge in the opposite direction of e
+        self.twin = np.empty(len(self.indices), dtype=np.int64)
+        self.twin[np.lexsort((self.tails, self.indices))] = np.arange(len(self.indices))
+
+        self.alive = np.ones(len(self.indices), dtype=np.bool_)
+        self.removed = []
+        self.blocked = np.zeros(self.n, dtype=np.bool_)
+        self.visited = np.zeros(self.n, dtype=np.bool_)
+        self.target = np.zeros(self.n, dtype=np.bool_)
+        self.parent = np.full(self.n, -1, dtype=np.int64)
+
+    def shortest_path(self, X, Y, limit):
+        """
+        Returns the edges of a shortest path (at most limit hops) from X to Y over
+        alive edges, from its end in Y back to X, or None. Ties are broken towards
+        the lowest predecessor and the first reached vertex of Y.
+        """
+        frontier = np.unique(X)
+        self.visited[frontier] = True
+        self.target[Y] = True
+        touched = [frontier]
+        found = None
+        for _ in range(limit):
+            edges, _ = expand(self.indptr, frontier)
+            edges = edges[self.alive[edges]]
+            heads = self.indices[edges]
+            new = ~self.visited[heads] & ~self.blocked[heads]
+            # frontier is sorted, so the first edge to a head has the lowest tail
+            frontier, first = np.unique(heads[new], return_index=True)
+            if len(frontier) == 0:
+                break
+            self.parent[frontier] = edges[new][first]
+            self.visited[frontier] = True
+            touched.append(frontier)
+            reached = self.target[frontier]
+            if reached.any():
+                found = frontier[reached]
+                break
+
+        path = None
+        if found is not None:
+            reached = set(found.tolist())
+            cur = next(y for y in Y if y in reached)
+            path = []
+            while self.parent[cur] >= 0:
+                edge = self.parent[cur]
+                path.append(self.twin[edge])
+                cur = self.tails[edge]
+
+        for vertices in touched:
+            self.visited[vertices] = False
+            self.parent[vertices] = -1
+        self.target[Y] = False
+        return path
+
+    def c_XY(self, X, Y, limit, bound=None):
+        """
+        Greedy number of edge-disjoint paths from X to Y: res[l] counts the paths
+        of at most l hops. With an upper bound on the number of edge-disjoint
+        paths (e.g. from a GomoryHuTree), the search stops once it is reached.
+        """
+        res = np.zeros((limit+1,), dtype=np.int32)
+        while bound is None or res[limit] < bound:
+            path = self.shortest_path(X, Y, limit)
+            if not path: break
+            res[len(path):] += 1
+            self.remove(path)
+        self.reset()
+        return res
+
+    def c_XY_many(self, queries, limit, bounds=None):
+        """
+        c_XY for a list of (X, Y) queries, up to 64 at a time: every query is a bit
+        lane of uint64 masks, the lanes advance their BFS layers together and keep
+        their own removed edges. Same results as c_XY per query (and its bound).
+        """
+        out = []
+        for i in range(0, len(queries), lanes):
+            out += self.__c_XY_lanes(queries[i:i+lanes], limit, None if bounds is None else bounds[i:i+lanes])
+        return out
+
+    def remove(self, path):
+        path = np.asarray(path, dtype=np.int64)
+        self.alive[path] = False
+        self.alive[self.twin[path]] = False
+        if self.vertex_disjoint:
+            # the path runs from Y back to X, its inner routers are the tails of all but the first edge
+            self.blocked[self.tails[path[1:]]] = True
+        self.removed.append(path)
+
+    def reset(self):
+        # O(length of the removed paths) instead of a copy of the graph
+        for path in self.removed:
+            self.alive[path] = True
+            self.alive[self.twin[path]] = True
+            self.blocked[self.tails[path[1:]]] = False
+        self.removed = []
+
+    # private methods
+    def __c_XY_lanes(self, queries, limit, bounds=None):
+        k = len(queries)
+        bit = np.left_shift(np.uint64(1), np.arange(k, dtype=np.uint64))
+        dead = np.zeros(len(self.indices), dtype=np.uint64)     # removed edges per lane
+        blocked = np.zeros(self.n, dtype=np.uint64)             # inner routers of the paths per lane
+        sources = np.zeros(self.n, dtype=np.uint64)
+        targets = np.zeros(self.n, dtype=np.uint64)
+        for lane, (X, Y) in enumerate(queries):
+            sources[X] |= bit[lane]
+            targets[Y] |= bit[lane]
+        res = np.zeros((k, limit+1), dtype=np.int32)
+        searching = np.bitwise_or.reduce(bit)
+        if bounds is not None:
+            for l, b in enumerate(bounds):
+                if b <= 0:
+                    searching &= ~bit[l]
+
+        # one round finds (at most) one more augmenting path per lane
+        while searching:
+            # layers[d][v]: lanes that reach v after d hops
+            layers = [sources & searching]
+            visited = layers[0].copy()
+            frontier = np.flatnonzero(visited)
+            fringe = visited[frontier]
+            found = {}
+            for d in range(1, limit+1):
+                edges, owner = expand(self.indptr, frontier)
+                heads = self.indices[edges]
+                step = fringe[owner] & ~dead[edges] & ~visited[heads] & ~blocked[heads]
+                hit = step != 0
+                new = np.zeros(self.n, dtype=np.uint64)
+                np.bitwise_or.at(new, heads[hit], step[hit])
+                visited |= new
+                layers.append(new)
+                frontier = np.flatnonzero(new)
+                fringe = new[frontier]
+
+                # lanes reaching Y stop at this layer
+                reached = fringe & targets[frontier]
+                done = np.bitwise_or.reduce(reached) if len(reached) else np.uint64(0)
+                if done:
+                    for l in np.flatnonzero(done & bit):
+                        found[l] = (d, set(frontier[(reached & bit[l]) != 0].tolist()))
+                    fringe &= ~done
+                    keep = fringe != 0
+                    frontier, fringe = frontier[keep], fringe[keep]
+                if len(frontier) == 0:
+                    break
+
+            for l in np.flatnonzero(searching & bit):
+                if l not in found:
+                    searching &= ~bit[l]
+                    continue
+                d, reached = found[l]
+                path = self.__trace(layers, dead, bit[l], next(y for y in queries[l][1] if y in reached), d)
+                res[l, len(path):] += 1
+                dead[path] |= bit[l]
+                dead[self.twin[path]] |= bit[l]
+                if self.vertex_disjoint:
+                    blocked[self.tails[path[1:]]] |= bit[l]
+                if bounds is not None and res[l, limit] >= bounds[l]:
+                    searching &= ~bit[l]
+
+        return list(res)
+
+    def __trace(self, layers, dead, bit, cur, d):
+        # walks back from cur (reached after d hops) over the lowest predecessor of
+        # every layer, as the parent edges of shortest_path
+        path = []
+        for j in range(d-1, -1, -1):
+            edges = np.arange(self.indptr[cur], self.indptr[cur+1])
+            edges = edges[((layers[j][self.indices[edges]] & bit) != 0) & ((dead[edges] & bit) == 0)]
+            path.append(edges[0])
+            cur = self.indices[edges[0]]
+        return path
+
+class ConnectivityCache:
+    """
+    LRU cache of the c_XY results of one graph, keyed by (X, Y). A result for limit
+    L answers every limit <= L, since the greedy paths come in non-decreasing length.
+    """
+    def __init__(self, maxsize=1000000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.queries = 0
+
+    @staticmethod
+    def key(X, Y):
+        # the search starts from the set X, the first reached vertex of Y in order wins
+        return (tuple(sorted(int(x) for x in X)), tuple(int(y) for y in Y))
+
+    def get(self, key, limit):
+        res = self.entries.get(key)
+        if res is None or len(res) <= limit:
+            return None
+        self.entries.move_to_end(key)
+        return res[:limit+1]
+
+    def put(self, key, res):
+        old = self.entries.get(key)
+        if old is None or len(old) < len(res):
+            self.entries[key] = res
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def resolve(self, queries, limit, search):
+        """
+        Returns c_XY of all (X, Y) queries. search(queries) is called once with the
+        distinct queries that are not cached and has to return their c_XY.
+        """
+        keys = [self.key(X, Y) for X, Y in queries]
+        out = [self.get(key, limit) for key in keys]
+        missing = {}
+        for key, (X, Y), res in zip(keys, queries, out):
+            if res is None:
+                missing.setdefault(key, (X, Y))
+        self.queries += len(queries)
+        self.hits += len(queries) - len(missing)
+        if missing:
+            found = dict(zip(missing.keys(), search(list(missing.values()))))
+            for key, res in found.items():
+                self.put(key, res)
+            out = [found[key] if res is None else res for key, res in zip(keys, out)]
+        return out
+
+    def load(self, datafile, fingerprint, limit, tag="connectivity"):
+        """
+        Adds the c_ab of the runs with this tag (connectivity: edge-disjoint paths)
+        of the graph with this fingerprint and maxlen >= limit stored in datafile
+        (runs written without routers or fingerprint and low-connectivity searches
+        are ignored).
+        """
+        if not path.exists(datafile):
+            return
+        conn = sqlite3.connect(datafile)
+        try:
+            columns = [d[0].lower() for d in conn.execute("SELECT * FROM runs LIMIT 1;").description]
+            columns += [d[0].lower() for d in conn.execute("SELECT * FROM datapoints LIMIT 1;").description]
+            if not {'fingerprint', 'a', 'b', 'c_ab'} <= set(columns):
+                return
+            # low-connectivity searches (factor) store only some of the pairs and lengths
+            complete = " AND runs.factor IS NULL" if 'factor' in columns else ""
+            rows = conn.execute("""SELECT runs.maxlen, a, b, len, c_ab FROM datapoints INNER JOIN runs ON runs.runid = datapoints.runid
+                                   WHERE runs.tag = ? AND runs.fingerprint = ? AND runs.maxlen >= ? AND a IS NOT NULL%s;""" % complete, (tag, fingerprint, limit))
+            found = {}
+            for maxlen, a, b, length, c_ab in rows:
+                res = found.setdefault(((a,), (b,)), np.zeros((maxlen+1,), dtype=np.int32))
+                if length < len(res):
+                    res[length] = c_ab
+            for key, res in found.items():
+                self.put(key, res)
+        finally:
+            conn.close()
+
+def reused_cache(datafiles, fingerprint, limit, tag="connectivity"):
+    # c_XY of the graph, loaded from the connectivity runs in datafiles (see ConnectivityCache.load)
+    cache = ConnectivityCache()
+    for datafile in dict.fromkeys(datafiles):
+        cache.load(datafile, fingerprint, limit, tag=tag)
+    return cache
+
+def search_chunk(h, chunk, limit, bounds=None):
+    """
+    c_XY of a chunk of queries on the ResidualGraph h, searched together (one bit
+    lane each). bounds(X, Y) is an upper bound of a query or None.
+    """
+    limits = None if bounds is None else [bounds(X, Y) for X, Y in chunk]
+    return h.c_XY_many(chunk, limit, None if limits is None or None in limits else limits)
+
+def search_parallel(h, queries, limit, bounds=None):
+    """
+    search_chunk over chunks of lanes queries in forked children, which write the
+    c_XY of their chunks in place, rows of one shared array.
+    """
+    def fill(start, end, out):
+        out[start:end] = search_chunk(h, queries[start:end], limit, bounds)
+    (out,) = pmap_into(fill, len(queries), [((limit+1,), np.int32)], chunksize=lanes)
+    return list(out)
+
+def complete(s):
+    return [[j for j in range(s) if j != i] for i in range(s)]
+
+def complete_bipartite(m):
+    return [[j for j in range(2*m) if (j < m) != (i < m)] for i in range(2*m)]
+
+def shared_cliques(s):
+    # two K_s sharing router 0
+    return [list(range(1, 2*s-1))] + [[j for j in range(s) if j != i] for i in range(1, s)] + \
+           [[0] + [j for j in range(s, 2*s-1) if j != i] for i in range(s, 2*s-1)]
+
+def validate_residual(limit=4):
+    # closed forms of c_XY on graphs with routers of up to 127 ports:
+    # K_s: the direct link and s-2 paths of 2 hops (edge- and vertex-disjoint)
+    # K_{m,m}: m paths of 2 hops on one side, the direct link and m-1 paths of 3 hops across
+    # two K_s sharing a router: all paths between the cliques pass it (vertex-disjoint)
+    from topogen.common import from_list_graph_to_sparse_matrix
+
+    cases = []
+    for vertex_disjoint in [False, True]:
+        for s in [8, 64, 128]:
+            cases.append(("K_%d" % s, complete(s), 0, s-1, [0, 1] + [s-1] * (limit-1), vertex_disjoint))
+        for m in [16, 80]:
+            cases.append(("K_%d,%d same side" % (m, m), complete_bipartite(m), 0, m-1, [0, 0] + [m] * (limit-1), vertex_disjoint))
+            cases.append(("K_%d,%d across" % (m, m), complete_bipartite(m), 0, 2*m-1, [0, 1, 1] + [m] * (limit-2), vertex_disjoint))
+    for s in [8, 64]:
+        cases.append(("two K_%d sharing a router" % s, shared_cliques(s), 1, s, [0, 0] + [1] * (limit-1), True))
+
+    results = []
+    for name, list_graph, a, b, expected, vertex_disjoint in cases:
+        kind = "vertex" if vertex_disjoint else "edge"
+        print("--> Validating %s-disjoint c_XY on %s with %d ports:" % (kind, name, max(len(row) for row in list_graph)))
+        h = ResidualGraph(from_list_graph_to_sparse_matrix(list_graph), vertex_disjoint=vertex_disjoint)
+        passed = list(h.c_XY([a], [b], limit)) == expected and list(h.c_XY([b], [a], limit)) == expected
+        passed = passed and [list(c) for c in h.c_XY_many([([a], [b]), ([b], [a])], limit)] == [expected, expected]
+        if not passed:
+            print("     --> residual graph error: unexpected number of %s-disjoint paths" % kind)
+        results.append(passed)
+
+    if all(results):
+        print("VALIDATION PASSED")
+    else:
+        print("VALIDATION NOT PASSED")
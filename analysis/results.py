@@ -11,26 +11,128 @@
 import sqlite3
 import inspect
 import subprocess
+import json
+from collections import Counter
+from glob import glob
+from itertools import repeat
+from os import remove, getenv
+from random import random
 from sys import stdin
+from time import sleep
 
 
-def growtable(conn, table, newcolumns):
+# SQLite settings of initdb, selected with the environment variable DBPROFILE or
+# the profile argument of Results. page_size only applies to new databases,
+# journal_mode WAL stays with the database file.
+profiles = {
+    # SQLite defaults: rollback journal, synchronous FULL
+    "default": {},
+    # concurrent jobs writing into the same database (on one host, WAL needs shared
+    # memory): readers and the writer do not block each other, commits are not synced
+    # until the WAL is checkpointed
+    "wal": {"journal_mode": "WAL", "synchronous": "NORMAL", "mmap_size": 1 << 30},
+    # big inserts: no syncs at all (a crash of the machine may corrupt the database),
+    # large pages, and the runtodata index of a new database is created on close
+    # instead of being updated with every row
+    "bulk": {"page_size": 65536, "journal_mode": "WAL", "synchronous": "OFF", "mmap_size": 1 << 30, "deferindex": True},
+}
+# also accepted: cache_size and temp_store, both made inserts and the grouped plot
+# queries slower in tools/benchmark_db_profiles
+pragmas = ["page_size", "journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store"]
+
+# concurrent writers: a locked database is waited for busy_timeout seconds (SQLite
+# busy handler), then the statement is retried busy_retries times with backoff
+busy_timeout = 60
+busy_retries = 5
+
+def retry(f, *args):
+    for attempt in range(busy_retries + 1):
+        try:
+            return f(*args)
+        except sqlite3.OperationalError as e:
+            if attempt == busy_retries or not ("locked" in str(e) or "busy" in str(e)):
+                raise
+            print("     --> %s, retrying" % e)
+            sleep(min(2 ** attempt, 30) * (0.5 + random()))
+
+
+def growtable(conn, table, newcolumns, verbose=True):
     c = conn.execute("SELECT * FROM %s LIMIT 1;" % table)
     columns = [d[0].lower() for d in c.description]
     for k, t in newcolumns.items():
         if k.lower() not in columns:
             q = "ALTER TABLE %s ADD COLUMN %s %s;" % (table, k, t.typename)
-            print(q)
+            if verbose:
+                print(q)
             conn.execute(q)
             
-def initdb(dbfile):
-    conn = sqlite3.connect(dbfile)
+def isscalar(values):
+    # numpy scalars and 0-d arrays, strings and numbers (anything without a length)
+    return getattr(values, 'ndim', None) == 0 or isinstance(values, (str, bytes)) or not hasattr(values, '__len__')
+
+# run catalog: the columns of the network lookups (common.is_in_db, find_runs) are
+# indexed, and latestruns holds the latest run of every configuration (all columns
+# but runid, githash and timestamp, as grouped by plotdata)
+catalogcolumns = ["topo", "n_r", "n_e", "r", "tag", "maxlen"]
+ignoredcolumns = ["runid", "githash", "timestamp"]
+
+# PRAGMA user_version of databases whose catalog has the keys of configuration
+catalogversion = 1
+
+def configuration(columns, row):
+    # NULL columns are left out, so adding columns does not change a configuration,
+    # and integral reals are integers (SQLite groups 1 and 1.0 together, too)
+    def normalize(v):
+        return int(v) if isinstance(v, float) and v.is_integer() else v
+    return json.dumps({k: normalize(v) for k, v in zip(columns, row) if k not in ignoredcolumns and v is not None}, sort_keys=True)
+
+def catalog(conn, runids=None):
+    """
+    Enters the runs (default: rebuilds the catalog from all runs) into latestruns
+    if they are at least as recent as the latest run of their configuration.
+    """
+    if runids is None:
+        conn.execute("DELETE FROM latestruns;")
+        c = conn.execute("SELECT * FROM runs ORDER BY timestamp, runid;")
+    else:
+        runids = sorted(runids)
+        # a run changed by update_run leaves its former configuration
+        conn.executemany("DELETE FROM latestruns WHERE runid = ?;", [(runid,) for runid in runids])
+        c = conn.execute("SELECT * FROM runs WHERE runid IN (%s) ORDER BY timestamp, runid;" % ", ".join("?" * len(runids)), runids)
+    columns = [d[0].lower() for d in c.description]
+    rows = [(configuration(columns, row), row[columns.index("runid")], row[columns.index("timestamp")]) for row in c]
+    conn.executemany("""INSERT INTO latestruns(config, runid, timestamp) VALUES (?, ?, ?)
+                        ON CONFLICT(config) DO UPDATE SET runid = excluded.runid, timestamp = excluded.timestamp
+                        WHERE excluded.timestamp >= latestruns.timestamp;""", rows)
+
+def initdb(dbfile, profile=None):
+    profile = profile or getenv("DBPROFILE", "default")
+    if profile not in profiles:
+        raise Exception("Unknown database profile %s, choose from %s" % (profile, ", ".join(profiles)))
+    settings = profiles[profile]
+    conn = sqlite3.connect(dbfile, timeout=busy_timeout)
     load_sqlite_ext(conn)
-    conn.execute("CREATE TABLE IF NOT EXISTS runs(runid INTEGER PRIMARY KEY AUTOINCREMENT, timestamp text, githash text, file text);")
-    conn.execute("CREATE TABLE IF NOT EXISTS datapoints(runid INTEGER REFERENCES runs(runid));")
-    conn.execute("CREATE INDEX IF NOT EXISTS runtodata ON datapoints(runid);")
+    for pragma in pragmas:
+        if pragma in settings:
+            retry(conn.execute, "PRAGMA %s = %s;" % (pragma, settings[pragma]))
+    retry(conn.execute, "CREATE TABLE IF NOT EXISTS runs(runid INTEGER PRIMARY KEY AUTOINCREMENT, timestamp text, githash text, file text);")
+    retry(conn.execute, "CREATE TABLE IF NOT EXISTS datapoints(runid INTEGER REFERENCES runs(runid));")
+    if not settings.get("deferindex"):
+        createindex(conn)
+    growtable(conn, "runs", {k: Results.Any for k in catalogcolumns}, verbose=False)
+    retry(conn.execute, "CREATE INDEX IF NOT EXISTS runcatalog ON runs(%s);" % ", ".join(catalogcolumns))
+    if next(conn.execute("PRAGMA user_version;"))[0] < catalogversion:
+        # first use of a database (possibly with runs from before the catalog), or a
+        # catalog with the keys of an older configuration
+        retry(conn.execute, "CREATE TABLE IF NOT EXISTS latestruns(config TEXT PRIMARY KEY, runid INTEGER REFERENCES runs(runid), timestamp TEXT);")
+        catalog(conn)
+        conn.execute("PRAGMA user_version = %d;" % catalogversion)
+        retry(conn.commit)
     return conn
 
+def createindex(conn):
+    retry(conn.execute, "CREATE INDEX IF NOT EXISTS runtodata ON datapoints(runid);")
+
 def load_sqlite_ext(conn):
     from pathlib import Path
     from os.path import realpath
@@ -59,60 +161,235 @@ class Results:
     # note that SQLite is always dynamically typed, and all columns can take any values
     # there will be some limited conversions when a type is given.
     class Type:
-        def __init__(self, name, convert):
+        def __init__(self, name, convert, dtype=None):
             self.typename = name;
             self.convert = convert
-    Int = Type('INTEGER', int)
-    Real = Type('REAL', float)
+            # numpy arrays are cast to dtype at once instead of converting every value
+            self.dtype = dtype
+
+        def column(self, values):
+            """
+            The converted values of a column: a sequence (list or numpy array), or a
+            scalar that is repeated for every row.
+            """
+            if isscalar(values):
+                return repeat(self.convert(values.item() if hasattr(values, 'item') else values))
+            if hasattr(values, 'tolist'):
+                if self.dtype is not None:
+                    return values.astype(self.dtype, copy=False).tolist()
+                values = values.tolist()
+            return map(self.convert, values)
+    Int = Type('INTEGER', int, 'int64')
+    Real = Type('REAL', float, 'float64')
     Text = Type('TEXT', str)
     Any = Type('', lambda x: x)
     types = {Int, Real, Text, Any}
     
-    def __init__(self, datafile = 'results.db', githash = None):
-        self.conn = initdb(datafile)
+    def __init__(self, datafile = 'results.db', githash = None, profile = None):
+        self.conn = initdb(datafile, profile)
+        self.datafile = datafile
+        self.profile = profile
         
         self.githash = githash
             
         # to make sure timestamp is fixed for this run
         self.timestamp = next(self.conn.execute("SELECT datetime('now');"))[0]
+
+        # aggregating collectors, flushed on commit
+        self.aggregates = []
+        # prints the new columns
+        self.verbose = True
+        # runs added or changed since the last commit, entered into the catalog on commit
+        self.changed = set()
+        # cached rows of lookup and the PRAGMA data_version they were read at
+        self.lookups = {}
+        self.lookupversion = None
         
     def collector(self, **parameters):
+        return self.__collector(inspect.stack()[1].filename, parameters)
+
+    def aggregator(self, **parameters):
+        """
+        Like collector, but the rows are counted per distinct values of the variables
+        and written as one row per distinct values with their count in the column
+        weight on commit. The run gets the column aggregate = 1.
+        """
+        parameters.update(weight=Results.Int, aggregate=1)
+        collect = Aggregate(self.__collector(inspect.stack()[1].filename, parameters))
+        self.aggregates.append(collect)
+        return collect
+
+    def __collector(self, filename, parameters):
         fixedparameters = {k: v for k, v in parameters.items() if v not in Results.types}
         fixedparameters['timestamp'] = self.timestamp
         fixedparameters['githash'] = self.githash
-        fixedparameters['file'] = inspect.stack()[1].filename
+        fixedparameters['file'] = filename
         varparameters = {k: v for k, v in parameters.items() if v in Results.types}
         varparameters['runid'] = Results.Int
 
         keys = sorted(fixedparameters.keys())
         varkeys = sorted(varparameters.keys())
-        varconvert = [varparameters[k].convert for k in varkeys]
-        growtable(self.conn, 'runs', {k: Results.Any for k in fixedparameters})         
-        growtable(self.conn, 'datapoints', varparameters)         
+        growtable(self.conn, 'runs', {k: Results.Any for k in fixedparameters}, self.verbose)
+        growtable(self.conn, 'datapoints', varparameters, self.verbose)
         
         self.conn.execute("INSERT INTO runs(%s) VALUES (%s);" 
                           % (", ".join(keys), ", ".join(["?"]*len(keys))),
                           [fixedparameters[k] for k in keys])
         
         runid = next(self.conn.execute("SELECT last_insert_rowid();"))[0]
+        self.changed.add(runid)
+        self.lookups.clear()
         
         insert = ("INSERT INTO datapoints(%s) VALUES (%s);" 
                           % (", ".join(varkeys), ", ".join(["?"]*len(varkeys))))
         
+        # one row, the values of the variables as keywords
         def collect(**kws):
-            kws['runid'] = runid
-            assert len(kws) == len(varkeys)
-            values = [conv(kws[k]) for k, conv in zip(varkeys, varconvert)]
-            self.conn.execute(insert, values)
-        
+            many(**{k: [v] for k, v in kws.items()})
+
+        # bulk variant: one sequence (list or numpy array) or scalar per variable, e.g.
+        # all rows of one length at once, inserted by one executemany
+        def many(**columns):
+            columns['runid'] = runid
+            assert len(columns) == len(varkeys)
+            rows = [varparameters[k].column(columns[k]) for k in varkeys]
+            assert not all(isinstance(column, repeat) for column in rows), "many needs at least one sequence"
+            if not self.conn.in_transaction:
+                # the rows of all batches until commit share one transaction
+                self.conn.execute("BEGIN;")
+            self.conn.executemany(insert, zip(*rows))
+
+        collect.many = many
+        collect.runid = runid
+        # to create shards of the run
+        collect.filename = filename
+        collect.parameters = parameters
+        collect.varkeys = varkeys
         return collect;
+
+    def update_run(self, collect, **parameters):
+        # sets (new) columns of the run of a collector, e.g. values known at the end of the run
+        growtable(self.conn, 'runs', {k: Results.Any for k in parameters})
+        keys = sorted(parameters.keys())
+        self.conn.execute("UPDATE runs SET %s WHERE runid = ?;" % ", ".join("%s = ?" % k for k in keys),
+                          [parameters[k] for k in keys] + [collect.runid])
+        self.changed.add(collect.runid)
+        self.lookups.clear()
+
+    def reweight(self, collect, weight):
+        """
+        Multiplies the weights of the rows of the run of collect (1 if it has none)
+        by weight, e.g. the rows of a representative router that stand for the pairs
+        of weight routers each. Call it after the last rows (and merge_shards).
+        """
+        if isinstance(collect, Aggregate):
+            collect.flush()
+        growtable(self.conn, 'datapoints', {'weight': Results.Int}, self.verbose)
+        self.conn.execute("UPDATE datapoints SET weight = coalesce(weight, 1) * ? WHERE runid = ?;", (weight, collect.runid))
+
+    def lookup(self, sql, parameters=()):
+        """
+        Rows of a parameterized query on the runs, cached until the database changes:
+        runs added or changed by this Results clear the cache, commits of any other
+        connection (e.g. concurrent jobs) change PRAGMA data_version.
+        """
+        version = next(self.conn.execute("PRAGMA data_version;"))[0]
+        if version != self.lookupversion:
+            self.lookups.clear()
+            self.lookupversion = version
+        key = (sql, tuple(parameters))
+        if key not in self.lookups:
+            self.lookups[key] = self.conn.execute(sql, parameters).fetchall()
+        return self.lookups[key]
     
+    def shardfile(self, collect, key):
+        stamp = self.timestamp.replace("-", "").replace(":", "").replace(" ", "T")
+        return "%s.%s.%d.%s.shard" % (self.datafile, stamp, collect.runid, key)
+
+    def shard(self, collect, key):
+        """
+        Collector with the run and the variables of collect (or its aggregator) that
+        writes into a results file of its own, e.g. one per forked worker and key
+        (its pid), so the worker streams its rows out instead of returning them.
+        Commit the shard (shard.results) after every chunk, merge_shards copies the
+        rows into the run of collect. A shard is a complete results file, the
+        shards left over by a crash can be added with merge.
+        """
+        aggregate = isinstance(collect, Aggregate)
+        inner = collect.collect if aggregate else collect
+        results = Results(self.shardfile(collect, key), self.githash, self.profile)
+        results.timestamp = self.timestamp
+        results.verbose = False
+        shard = results.__collector(inner.filename, inner.parameters)
+        if aggregate:
+            shard = Aggregate(shard)
+            results.aggregates.append(shard)
+        shard.results = results
+        return shard
+
+    def merge_shards(self, collect):
+        """
+        Copies the rows of all shards of collect into its run with one ATTACH and
+        INSERT ... SELECT per shard and removes the shards. Commits, the run is
+        stored before its rows (ATTACH is not possible within a transaction).
+        """
+        inner = collect.collect if isinstance(collect, Aggregate) else collect
+        columns = ", ".join(k for k in inner.varkeys if k != "runid")
+        self.commit()
+        for shardfile in sorted(glob(self.shardfile(collect, "*"))):
+            self.conn.execute("ATTACH DATABASE ? AS shard;", (shardfile,))
+            self.conn.execute("INSERT INTO datapoints(runid, %s) SELECT ?, %s FROM shard.datapoints;" % (columns, columns), (collect.runid,))
+            retry(self.conn.commit)
+            self.conn.execute("DETACH DATABASE shard;")
+            remove(shardfile)
+
     def close(self):
+        self.commit()
+        # bulk profile: the index of a new database is built once, after the inserts
+        createindex(self.conn)
         self.conn.commit()
         self.conn.close()
         
     def commit(self):
-        self.conn.commit()
+        for collect in self.aggregates:
+            collect.flush()
+        if self.changed:
+            catalog(self.conn, self.changed)
+            self.changed = set()
+        retry(self.conn.commit)
+
+class Aggregate:
+    # in-memory count table of a collector, see Results.aggregator
+    def __init__(self, collect):
+        self.collect = collect
+        self.runid = collect.runid
+        self.keys = None
+        self.counts = Counter()
+
+    def __call__(self, **kws):
+        self.many(**{k: [v] for k, v in kws.items()})
+
+    # bulk variant: one sequence of values (or a scalar) per variable and optionally the weight of every row
+    def many(self, weight=None, **columns):
+        keys = sorted(columns.keys())
+        if self.keys is None:
+            self.keys = keys
+        assert keys == self.keys
+        assert not all(isscalar(columns[k]) for k in keys), "many needs at least one sequence"
+        # numpy scalars hash slowly and are not accepted by sqlite
+        values = [columns[k].tolist() if hasattr(columns[k], 'tolist') else columns[k] for k in keys]
+        rows = zip(*[repeat(v) if isscalar(v) else v for v in values])
+        if weight is None:
+            self.counts.update(rows)
+        else:
+            for row, w in zip(rows, weight):
+                self.counts[row] += int(w)
+
+    def flush(self):
+        if self.counts:
+            rows = list(self.counts.keys())
+            self.collect.many(weight=[self.counts[row] for row in rows], **{k: [row[i] for row in rows] for i, k in enumerate(self.keys)})
+            self.counts.clear()
         
 def mergeresults(datafile, addedfile):
     assert datafile != addedfile
@@ -144,6 +421,8 @@ def mergeresults(datafile, addedfile):
     conn.execute("""INSERT INTO datapoints(runid,  %s) SELECT newid,  %s 
                     FROM new.datapoints INNER JOIN idmap ON runid = oldid 
                     WHERE runid in newids;""" % (newdatacols, newdatacols))
+    createindex(conn)
+    catalog(conn)
     conn.commit()
     conn.close()
 
@@ -152,13 +431,14 @@ def plotdata(datafile, sql = None, runsql = None, datasql = None, runwhere = Non
     
     if not sql:
         if not runsql:
-            c = conn.execute("SELECT * FROM runs LIMIT 1;")
-            cols = ", ".join(d[0] for d in c.description if d[0] not in ["runid", "githash", "timestamp"])
             if runwhere:
-                clause = "WHERE %s" % runwhere
+                # the latest of the selected runs of every configuration
+                c = conn.execute("SELECT * FROM runs LIMIT 1;")
+                cols = ", ".join(d[0] for d in c.description if d[0] not in ignoredcolumns)
+                runsql = "SELECT max(timestamp), * FROM runs WHERE %s GROUP BY %s" % (runwhere, cols)
             else:
-                clause = ""
-            runsql = "SELECT max(timestamp), * FROM runs %s GROUP BY %s" % (clause, cols)
+                # the latest run of every configuration from the catalog
+                runsql = "SELECT runs.timestamp AS \"max(timestamp)\", runs.* FROM latestruns INNER JOIN runs ON runs.runid = latestruns.runid"
             
         if not datasql:
             if group:
@@ -109,15 +109,20 @@ def pyplot(outfile, size, manual, **kwargs):
                 # calculate data
                 plotData = []
                 plotDataJF = []
+                # the last column weights the rows (aggregated runs)
+                plotWeights = []
+                plotWeightsJF = []
 
                 for j in range(numClasses):
                     plotData.append([d[0] for d in data[i][j]])
+                    plotWeights.append([d[-1] for d in data[i][j]])
                     if jf:
                         plotDataJF.append([d[0] for d in data[numPlots + i][j]])
+                        plotWeightsJF.append([d[-1] for d in data[numPlots + i][j]])
               
-                n = axs[0][i].hist(plotData,bins,density=density, histtype='bar', label=classes, align='mid', color=colors)[0]
+                n = axs[0][i].hist(plotData,bins,weights=plotWeights,density=density, histtype='bar', label=classes, align='mid', color=colors)[0]
                 if jf:
-                    nJF = axs[1][i].hist(plotDataJF,bins,density=density, histtype='bar', label=classes, align='mid', color=colors)[0]
+                    nJF = axs[1][i].hist(plotDataJF,bins,weights=plotWeightsJF,density=density, histtype='bar', label=classes, align='mid', color=colors)[0]
 
                 maxY = 0
                 if numClasses == 1:           
@@ -268,7 +273,7 @@ def pyplot(outfile, size, manual, **kwargs):
             for i in range(numPlots):
                 data.append([])
                 for j in range(0,l_min):
-                    data[i].append(conn.execute("SELECT C0,C1 FROM data WHERE C3 = '%s' AND C2 = '%s';" %(topos[i],preset+str(j+1))).fetchall())
+                    data[i].append(conn.execute("SELECT C0,C1,C4 FROM data WHERE C3 = '%s' AND C2 = '%s';" %(topos[i],preset+str(j+1))).fetchall())
 
             plotData=[]
             for i in range(numPlots):
@@ -276,7 +281,8 @@ def pyplot(outfile, size, manual, **kwargs):
                 for j in range(l_min):
                     x = [d[0] for d in data[i][j]]
                     y = [d[1] for d in data[i][j]]
-                    h, xedges, yedges = np.histogram2d(x,y,bins=(bins,bins))
+                    w = [d[2] for d in data[i][j]]
+                    h, xedges, yedges = np.histogram2d(x,y,bins=(bins,bins),weights=w)
                     plotData[i].append(h)
                     for row in h:
                         for entry in row:
@@ -337,7 +343,7 @@ def pyplot(outfile, size, manual, **kwargs):
                 t = topos[i]
                 data.append([])
                 for j in range(l_min):
-                    data[i].append(conn.execute("SELECT C0 FROM data WHERE C2 = '%s' AND C1 = 'l=%i';" %(t, j+1)).fetchall())
+                    data[i].append(conn.execute("SELECT C0,C3 FROM data WHERE C2 = '%s' AND C1 = 'l=%i';" %(t, j+1)).fetchall())
 
             maxX = int(conn.execute("SELECT MAX(C0) FROM data;").fetchall()[0][0])
             maxY = 0
@@ -352,7 +358,7 @@ def pyplot(outfile, size, manual, **kwargs):
             for i in range(numPlots):
                 for j in range(l_min):
                      # use numpy histogram for performance reasons
-                     h, edges = np.histogram(data[i][j],bins=bins, density=density)
+                     h, edges = np.histogram([d[0] for d in data[i][j]],bins=bins, weights=[d[1] for d in data[i][j]], density=density)
                      for value in h:
                          if value > maxY:
                              maxY = value
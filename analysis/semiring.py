@@ -0,0 +1,173 @@
+# Copyright (c) 2025 ETH Zurich.
+#                    All rights reserved.
+#
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+# Matrix-matrix multiplication over semirings with pluggable backends:
+#   numpy   - dense numpy arrays (always available)
+#   scipy   - scipy.sparse matrices
+#   mmm_ops - blocked OpenMP kernels from mmm_ops.c (built by the Makefile)
+
+import numpy as np
+import scipy.sparse as ss
+
+try:
+    from . import mmm_ops
+except ImportError:
+    mmm_ops = None
+
+
+class Semiring:
+    def __init__(self, name, dtypes):
+        self.name = name
+        self.dtypes = dtypes    # supported compact dtypes, narrowest first
+
+    def identity(self, n, dtype):
+        if self.name == 'distance':
+            m = np.full((n, n), np.iinfo(dtype).max, dtype=dtype)
+            np.fill_diagonal(m, 0)
+            return m
+        return np.identity(n, dtype=dtype)
+
+# (+, x) walk counting, (min, +) distances (largest value is infinity), (or, and) reachability
+semirings = {
+    'count': Semiring('count', [np.uint32, np.uint64]),
+    'distance': Semiring('distance', [np.uint8, np.uint16]),
+    'reach': Semiring('reach', [np.uint8]),
+}
+
+# walk counters of the count semiring, narrowest first
+counters = [np.uint8, np.uint16, np.uint32, np.uint64]
+
+class Counter:
+    """
+    Chooses the dtype of the walk counts acc * A for an adjacency matrix A with
+    maximum (weighted) degree maxdeg. The entries of acc * A are bounded by
+    max(acc) * maxdeg, so the dtype is widened before a product could overflow.
+
+    With a cap, all entries are saturated at cap after every product. This is
+    exact for min(multiplicity, cap): an entry below cap only sums terms below cap.
+    """
+    def __init__(self, maxdeg, cap=None):
+        self.maxdeg = max(int(maxdeg), 1)
+        self.cap = cap
+        self.dtype = self.narrowest(cap * self.maxdeg if cap else self.maxdeg)
+
+    def narrowest(self, bound):
+        for dtype in counters:
+            if bound <= np.iinfo(dtype).max:
+                return dtype
+        return None
+
+    def fit(self, maximum):
+        """
+        Returns the dtype for the next product of a matrix with largest entry maximum.
+        """
+        bound = int(maximum) * self.maxdeg
+        if bound > np.iinfo(self.dtype).max:
+            dtype = self.narrowest(bound)
+            if dtype is None:
+                # beyond 64 bit, saturate (SQLite integers are signed 64 bit anyway)
+                self.cap = np.iinfo(np.uint64).max // self.maxdeg
+                print("     --> multiplicities saturate at %d" % self.cap)
+                dtype = np.uint64
+            self.dtype = dtype
+        return self.dtype
+
+    def prepare(self, acc):
+        """
+        Returns acc in a dtype (and saturated if needed) such that acc * A cannot overflow.
+        """
+        self.fit(acc.max() if acc.size else 0)
+        return self.saturate(acc).astype(self.dtype, copy=False)
+
+    def saturate(self, m):
+        if self.cap:
+            data = m.data if ss.issparse(m) else m
+            np.minimum(data, self.cap, out=data)
+        return m
+
+# float64 holds all integers below 2^53 exactly
+exact_float = 2 ** 53
+
+def numpy_matmul(a, b, semiring, dtype):
+    a = np.asarray(a, dtype=dtype)
+    b = np.asarray(b, dtype=dtype)
+    if semiring == 'count':
+        # numpy has no BLAS for integer products, counts are multiplied in float64 as
+        # long as the entries (at most max(a) times a column sum of b) stay exact
+        if a.size and b.size and int(a.max()) * int(b.sum(axis=0).max()) < exact_float:
+            return np.asarray(a, dtype=np.float64).dot(np.asarray(b, dtype=np.float64)).astype(dtype)
+        return a.dot(b)
+    elif semiring == 'reach':
+        return (a.astype(bool).dot(b.astype(bool))).astype(dtype)
+    elif semiring == 'distance':
+        inf = np.iinfo(dtype).max
+        out = np.full((a.shape[0], b.shape[1]), inf, dtype=dtype)
+        for k in range(a.shape[1]):
+            s = a[:, k, None].astype(np.int64) + b[None, k, :]
+            np.minimum(out, np.minimum(s, inf).astype(dtype), out=out)
+        return out
+    raise Exception('invalid semiring')
+
+def scipy_matmul(a, b, semiring, dtype):
+    if semiring == 'distance':
+        # implicit zeros of sparse matrices cannot represent infinity
+        return numpy_matmul(a.toarray() if ss.issparse(a) else a, b.toarray() if ss.issparse(b) else b, semiring, dtype)
+    a = ss.csr_matrix(a, dtype=dtype)
+    b = ss.csr_matrix(b, dtype=dtype)
+    if semiring == 'count':
+        return a.dot(b)
+    elif semiring == 'reach':
+        return (a.dot(b) != 0).astype(dtype)
+    raise Exception('invalid semiring')
+
+# mmm_ops kernels (or the whole module) that are missing, reported once
+missing_kernels = set()
+
+def mmm_ops_matmul(a, b, semiring, dtype):
+    name = "mmm_%s_%s" % (semiring, np.dtype(dtype).name)
+    kernel = getattr(mmm_ops, name, None)
+    if kernel is None:
+        if name not in missing_kernels:
+            missing_kernels.add(name)
+            print("     --> no mmm_ops kernel %s (an old mmm_ops.so or an unsupported dtype), falling back to numpy" % name)
+        return numpy_matmul(a, b, semiring, dtype)
+    a = np.ascontiguousarray(a, dtype=dtype)
+    b = np.ascontiguousarray(b, dtype=dtype)
+    out = np.empty((a.shape[0], b.shape[1]), dtype=dtype)
+    return kernel(a, b, out)
+
+def count_workspace(backend, dtype):
+    """
+    Bytes per entry of the temporaries of a dense count product besides its operands
+    and result: the float64 copies of both operands and of the product wherever the
+    numpy path multiplies.
+    """
+    if backend == 'scipy' or (backend == 'mmm_ops' and hasattr(mmm_ops, "mmm_count_%s" % np.dtype(dtype).name)):
+        return 0
+    return 3 * np.dtype(np.float64).itemsize
+
+backends = {
+    'numpy': numpy_matmul,
+    'scipy': scipy_matmul,
+    'mmm_ops': mmm_ops_matmul,
+}
+
+def get_backend(name):
+    if name == 'mmm_ops' and mmm_ops is None:
+        if name not in missing_kernels:
+            missing_kernels.add(name)
+            print("mmm_ops.so not found (run make in analysis/), falling back to numpy")
+        name = 'numpy'
+    return backends[name]
+
+def matmul(a, b, semiring='count', backend='numpy', dtype=None):
+    """
+    Returns a (x) b over the given semiring. dtype defaults to the narrowest type
+    supported by the semiring.
+    """
+    if dtype is None:
+        dtype = semirings[semiring].dtypes[0]
+    return get_backend(backend)(a, b, semiring, dtype)
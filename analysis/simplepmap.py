@@ -6,9 +6,12 @@
 #
 # Main author: Marcel Schneider
 
-from os import fork, pipe, _exit, wait, fdopen, getenv, close
+from os import fork, pipe, _exit, waitpid, fdopen, getenv, close
 from pickle import dump, load
-from multiprocessing import cpu_count
+from multiprocessing import cpu_count, Value
+from traceback import format_exc
+from mmap import mmap
+import numpy as np
 
 
 # compared to multiprocessing.Pool.map, this simple implementation is
@@ -16,45 +19,98 @@ from multiprocessing import cpu_count
 # - less cpu-wasting (no pickling of input data)
 # but:
 # - more constant overhead: forks per call
-# - no real scheduling, simply divides work in the beginning.
+#
+# Work is self-scheduled: the children take chunks of chunksize consecutive
+# arguments from a shared counter until all are taken, so a child that got
+# expensive arguments (e.g. far router pairs of the flow analyses) does not keep
+# the others idle.
+#
+# pmap returns the results of every child through a pipe (pickled), pmap_into
+# lets the children write typed results in place into shared memory.
 
-def pmap(func, args):
-    n = len(args)
-    ncpu = int(getenv("NPROCS", cpu_count()))
-    block = int(n / ncpu)
-    pipes = []
-    for i in range(0, ncpu):
-        start = i*block
-        end = (i+1)*block
-        if i == (ncpu-1):
-            end = n
+def pmap(func, args, chunksize=None):
+    out = [None] * len(args)
+    for start, results in forall(len(args), lambda start, end: list(map(func, args[start:end])), chunksize):
+        out[start:start+len(results)] = results
+    return out
+
+def pmap_into(func, n, outputs, chunksize=None):
+    """
+    Calls func(start, end, *arrays) for chunks [start, end) of range(n) in the
+    children, func writes its results into arrays[start:end]. outputs: list of
+    (shape, dtype) of the rows, the arrays of shape (n,) + shape live in shared
+    anonymous memory and are returned without pickling or copying.
+    """
+    arrays = []
+    for shape, dtype in outputs:
+        shape = (n,) + tuple(shape)
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape)) * dtype.itemsize
+        arrays.append(np.frombuffer(mmap(-1, max(size, 1)), dtype=dtype, count=int(np.prod(shape))).reshape(shape))
+    forall(n, lambda start, end: func(start, end, *arrays), chunksize)
+    return arrays
 
+def forall(n, work, chunksize=None):
+    """
+    Runs work(start, end) for chunks of range(n) in forked children, returns the
+    list of (start, result) of all chunks (in no particular order).
+    """
+    ncpu = min(int(getenv("NPROCS", cpu_count())), n)
+    if ncpu == 0:
+        return []
+    if chunksize is None:
+        # a few chunks per child, so the last ones even out the skew
+        chunksize = max(1, n // (8 * ncpu))
+    counter = Value('q', 0)
+
+    def take():
+        with counter.get_lock():
+            start = counter.value
+            counter.value = min(start + chunksize, n)
+        return start
+
+    children = []
+    for i in range(0, ncpu):
         (r, w) = pipe()
         pid = fork()
         if pid == 0: # child
-            out = list(map(func, args[start:end]))
+            status = 0
+            try:
+                out = []
+                start = take()
+                while start < n:
+                    out.append((start, work(start, min(start + chunksize, n))))
+                    start = take()
+            except:
+                # stops the others at their next chunk
+                with counter.get_lock():
+                    counter.value = n
+                out = format_exc()
+                status = 1
             with fdopen(w, 'wb') as f:
                 dump(out, f)
-            _exit(0)
-        # parent 
-        pipes.append(r)
+            _exit(status)
+        # parent
+        children.append((pid, r))
         close(w)
+
     out = []
-    fail = False
-    for i, p in enumerate(pipes):
+    fail = []
+    for pid, p in children:
         try:
             with fdopen(p, 'rb') as f:
                 res = load(f)
-                out = out + res
         except:
-            print("load failed, output incomplete")
-            fail = True
-        (pid, status) = wait()
-        if status != 0:
-          print("Child failed! (%d, %d, %d)" % (pid, status / 256, status % 256))
-          fail = True
+            res = "load failed, output incomplete"
+        if isinstance(res, str):
+            fail.append(res)
+        else:
+            out += res
+        (pid, status) = waitpid(pid, 0)
+        if status != 0 and not fail:
+            fail.append("Child failed! (%d, %d, %d)" % (pid, status / 256, status % 256))
     if fail:
-      raise Exception("pmap failed!")
+        raise Exception("pmap failed!\n" + fail[0])
     return out
 
 if __name__ == '__main__':
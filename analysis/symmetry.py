@@ -0,0 +1,72 @@
+# Copyright (c) 2025 ETH Zurich.
+#                    All rights reserved.
+#
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+# Orbit reduction for vertex-transitive topologies: the distributions over all
+# pairs of routers equal the ones over the pairs of a single source, so the shortest
+# path and distance analyses use one representative router (weight R) instead of
+# sampling. Not the greedy disjoint path counts: they break ties by router id.
+#
+# Topologies declare Topology.vertex_transitive. The declaration is sanity checked
+# with a colour refinement (vertices of one orbit never get different colours)
+# and by comparing the distance profiles of a few routers with the representative.
+
+import numpy as np
+from .bfs import count_bfs
+from topogen.common import from_list_graph_to_sparse_matrix
+
+
+def refine(graph, colours):
+    """
+    Colour refinement on a CSR graph: vertices keep the same colour as long as they
+    have the same colour and the same multiset of neighbour colours. Returns the
+    stable colouring (colours 0..k-1).
+    """
+    rng = np.random.default_rng(0)
+    colours = np.unique(colours, return_inverse=True)[1]
+    rows = np.repeat(np.arange(graph.shape[0]), np.diff(graph.indptr))
+    while True:
+        # hash of the neighbour colour multisets (sum of random keys per colour)
+        keys = rng.integers(1, 1 << 62, size=colours.max() + 1, dtype=np.int64)
+        neighbours = np.zeros(graph.shape[0], dtype=np.int64)
+        np.add.at(neighbours, rows, keys[colours[graph.indices]])
+        refined = np.unique(np.stack([colours, neighbours]), axis=1, return_inverse=True)[1].ravel()
+        if refined.max() == colours.max():
+            return refined
+        colours = refined
+
+def distance_profile(graph, source, limit):
+    dist, _ = count_bfs(graph, source, limit)
+    return np.bincount(dist[dist >= 0], minlength=limit + 1)
+
+def check_vertex_transitive(network, probes=8, limit=None):
+    """
+    Sanity check of network.vertex_transitive (necessary conditions only).
+    """
+    graph = from_list_graph_to_sparse_matrix(network.get_topo())
+    n = graph.shape[0]
+    endpoints = np.arange(n) < network.edge
+    colours = refine(graph, np.stack([np.diff(graph.indptr), endpoints]).T.dot([1, n]))
+    if colours.max() != 0:
+        return False
+    limit = limit or n
+    reference = distance_profile(graph, 0, limit)
+    for v in np.random.default_rng().choice(n, size=min(probes, n), replace=False):
+        if not np.array_equal(distance_profile(graph, v, limit), reference):
+            return False
+    return True
+
+def representatives(network):
+    """
+    Returns the representative sources of the routers with endpoints: [0] if the
+    network is vertex-transitive (each pair from router 0 stands for R pairs),
+    None if pairs have to be sampled over all sources.
+    """
+    if not network.vertex_transitive:
+        return None
+    if not check_vertex_transitive(network):
+        print("     --> %s is declared vertex-transitive but fails the check, sampling all sources" % network.name)
+        return None
+    return np.array([0])
@@ -229,6 +229,18 @@ if __name__ == "__main__":
     parser_validate_hypercube = parser_validate_subparser.add_parser("hypercube", help='validates random Hypercube topologies')
     parser_validate_hypercube.set_defaults(func=vhc.validate_hypercube)
 
+    # closed-form shortest path distributions of the analysis
+    parser_validate_oracles = parser_validate_subparser.add_parser("oracles", help='cross-checks the closed-form shortest path distributions against generated topologies')
+    parser_validate_oracles.set_defaults(func=an.oracles.validate_oracles)
+
+    # edge-disjoint paths of the residual graph on high-radix routers
+    parser_validate_disjointpaths = parser_validate_subparser.add_parser("disjointpaths", help='checks the edge- and vertex-disjoint path counts against closed forms on routers with up to 127 ports')
+    parser_validate_disjointpaths.set_defaults(func=an.residual.validate_residual)
+
+    # all-pairs edge connectivity of the Gomory-Hu tree
+    parser_validate_gomoryhu = parser_validate_subparser.add_parser("gomoryhu", help='checks the edge connectivity of the Gomory-Hu tree against one maximum flow per pair')
+    parser_validate_gomoryhu.set_defaults(func=an.gomoryhu.validate_gomoryhu)
+
     # Torus
     parser_validate_torus = parser_validate_subparser.add_parser("torus", help='validates random Torus topologies')
     parser_validate_torus.set_defaults(func=vto.validate_torus)
@@ -285,7 +297,7 @@ if __name__ == "__main__":
     # Cleaning generated Toplogies 
     parser_clean = subparser.add_parser("clean", help='removes generated topologies')
     parser_clean.add_argument('-t', '--topos', type=str, nargs='+', default=[], help="all or topology folder e.g. hypercubes, tori,..")
-    parser_clean.add_argument('-db', '--databases', type=str, nargs='+', default=[], choices=["all", "shortest_paths.db", "interference.db","edge_disjoint_paths.db", "low_connectivity.db"], help="all or databases")
+    parser_clean.add_argument('-db', '--databases', type=str, nargs='+', default=[], choices=["all", "shortest_paths.db", "interference.db","edge_disjoint_paths.db", "low_connectivity.db", "distances.db", "edge_connectivity.db", "vertex_disjoint_paths.db"], help="all or databases")
     parser_clean.add_argument('-p', default=False, action='store_true', help="delete all the plotfiles (*_plot.pdf and *_plot.info)")
     parser_clean.add_argument('-a', default=False, action='store_true', help="delete all (topologies, databases and plots/plotinfos)")
     parser_clean.set_defaults(func=clean_topologies)
@@ -304,17 +316,42 @@ if __name__ == "__main__":
     parser_analyse_shortest_paths = parser_analyse_subparser.add_parser('shortestpaths' , help='analyses shortest paths')
     parser_analyse_shortest_paths.add_argument('-s', '--sparse', action='store_true', help='use sparse matrices')
     parser_analyse_shortest_paths.add_argument('--parallel', action='store_true', help='uses parallel matrix multiplication')
+    parser_analyse_shortest_paths.add_argument('--engine', choices=['matrix', 'rows', 'bfs'], default='matrix', help='matrix: powers of the adjacency matrix, rows: powers restricted to the rows of sampled sources, bfs: one counting BFS per sampled source')
+    parser_analyse_shortest_paths.add_argument('--backend', choices=['numpy', 'scipy', 'mmm_ops'], default='numpy', help='matrix multiplication backend for dense matrices (mmm_ops requires make in analysis/)')
+    parser_analyse_shortest_paths.add_argument('--mem-budget', dest='mem_budget', type=an.outofcore.parse_size, default=None, help='dense mode only: keeps the matrix powers as tiled memory-mapped files and bounds the resident tiles to this size (e.g. 8G)')
+    parser_analyse_shortest_paths.add_argument('--scratch', default=None, help='directory of the memory-mapped files of --mem-budget (default: system temporary directory)')
+    parser_analyse_shortest_paths.add_argument('-m', '--maxmultiplicity', type=int, default=None, help='saturates multiplicities at this value, exact for plots of min(multiplicity, m) with m <= maxmultiplicity (default: exact counts)')
+    parser_analyse_shortest_paths.add_argument('--no-oracle', dest='oracle', action='store_false', help='generates and analyses the graph even if a closed-form distribution is known (HC, tori, HyperX, flattened butterflies, k-ary n-trees, fat trees)')
     parser_analyse_shortest_paths.set_defaults(analyse_function='shortestpaths')
 
     parser_analyse_disjoint_paths = parser_analyse_subparser.add_parser('disjointpaths' , help='analyses disjoint paths')
     parser_analyse_disjoint_paths.set_defaults(analyse_function='disjointpaths')
+    parser_analyse_vertex_disjoint = parser_analyse_subparser.add_parser('vertexdisjoint' , help='analyses vertex-disjoint paths (no shared routers)')
+    parser_analyse_vertex_disjoint.set_defaults(analyse_function='vertexdisjoint')
+    for sub in [parser_analyse_disjoint_paths, parser_analyse_vertex_disjoint]:
+        sub.add_argument('-f', '--factor', type=float, default=None, help='low-connectivity search: each unordered pair once, searches stop above factor*r paths and only the pairs with c_l <= factor*r (and links) are stored')
     parser_analyse_interference = parser_analyse_subparser.add_parser('interference' , help='analyses interference')
+    parser_analyse_interference.add_argument('--stream', action='store_true', help='the workers store their rows in shard files as they go (committed per chunk), merged into the database at the end of every network')
     parser_analyse_interference.set_defaults(analyse_function='interference')
-
-    for sub in [parser_analyse_shortest_paths, parser_analyse_disjoint_paths, parser_analyse_interference]:
+    for sub in [parser_analyse_shortest_paths, parser_analyse_disjoint_paths, parser_analyse_vertex_disjoint, parser_analyse_interference]:
+        sub.add_argument('--ci', type=float, default=None, help='adaptive sampling: stops as soon as the 95%% confidence intervals of the plotted fractions are at most this half-width (e.g. 0.005), the number of samples is the upper bound (shortestpaths: bfs and rows engines)')
+        sub.add_argument('--aggregate', action='store_true', help='stores one row per distinct plotted values with its count (column weight) instead of one row per sample')
+    for sub in [parser_analyse_disjoint_paths, parser_analyse_vertex_disjoint, parser_analyse_interference]:
+        sub.add_argument('--reuse', action='store_true', help='reuses the c_XY of earlier connectivity runs on the same graph (same fingerprint, maxlength at least -l) stored with the routers')
+        sub.add_argument('--prune', action='store_true', help='stops every search at the unbounded edge connectivity of its routers (Gomory-Hu tree), same results')
+    parser_analyse_distances = parser_analyse_subparser.add_parser('distances' , help='exact all-pairs distance histograms')
+    parser_analyse_distances.add_argument('--parallel', action='store_true', help='processes batches of sources in parallel')
+    parser_analyse_distances.set_defaults(analyse_function='distances')
+    parser_analyse_edge_connectivity = parser_analyse_subparser.add_parser('edgeconnectivity' , help='all-pairs edge connectivity (unbounded path length) from a Gomory-Hu tree')
+    parser_analyse_edge_connectivity.add_argument('--aggregate', action='store_true', help='stores one row per distinct connectivity with its count (column weight) instead of one row per pair')
+    # unbounded path lengths, there is no -l
+    parser_analyse_edge_connectivity.set_defaults(analyse_function='edgeconnectivity', maxlength=None)
+
+    for sub in [parser_analyse_shortest_paths, parser_analyse_disjoint_paths, parser_analyse_vertex_disjoint, parser_analyse_interference, parser_analyse_distances, parser_analyse_edge_connectivity]:
         sub.add_argument('-t', '--topos', type=str, nargs='+', choices=[topo for topo in tg.toponames.keys() if topo != 'JF'], required=True, help="specifies the topologies")
         sub.add_argument('-c', '--classes', type=int, nargs='+', required=True, help="specifies the classes defining the number of host a topology have")
-        sub.add_argument('-l', '--maxlength', type=int, default=5, help="specifies the maxiumum length of search space")
+        if sub is not parser_analyse_edge_connectivity:
+            sub.add_argument('-l', '--maxlength', type=int, default=5, help="specifies the maxiumum length of search space")
         sub.add_argument('-j', '--jellyfish', default=False, action='store_true', help="for each topology the jellyfish equivalent topology is also analysed")
         sub.set_defaults(func=analyse)
 
@@ -0,0 +1,59 @@
+# Copyright (c) 2025 ETH Zurich.
+#                    All rights reserved.
+#
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+# Benchmark of the SQLite profiles of analysis/results.py (initdb): bulk inserts
+# of a datapoints table through collect.many with a commit every batch, closing
+# (the bulk profile builds the runtodata index there), and a plot-style query
+# that joins the datapoints of one run.
+#
+# run from the repository root: python3 -m tools.benchmark_db_profiles [rows] [batch] [directory]
+
+import sys
+from os import path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import numpy as np
+
+from analysis import results
+from analysis.results import Results
+
+
+def insert(datafile, profile, rows, batch):
+    res = Results(datafile, profile=profile)
+    res.verbose = False
+    collect = res.collector(a=Results.Int, b=Results.Int, len=Results.Int, c_ab=Results.Int, topo="benchmark", tag="connectivity")
+    runid = collect.runid
+    rng = np.random.default_rng(0)
+    start = perf_counter()
+    for i in range(0, rows, batch):
+        n = min(batch, rows - i)
+        collect.many(a=rng.integers(0, 1000, n), b=rng.integers(0, 1000, n), len=rng.integers(1, 6, n), c_ab=rng.integers(0, 32, n))
+        res.commit()
+    inserted = perf_counter() - start
+    start = perf_counter()
+    res.close()
+    return runid, inserted, perf_counter() - start
+
+def query(datafile, profile, runid):
+    conn = results.initdb(datafile, profile)
+    start = perf_counter()
+    conn.execute("SELECT len, c_ab, count(*) FROM datapoints INNER JOIN runs ON runs.runid = datapoints.runid WHERE runs.runid = ? GROUP BY len, c_ab;", (runid,)).fetchall()
+    elapsed = perf_counter() - start
+    conn.close()
+    return elapsed
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    with TemporaryDirectory(dir=sys.argv[3] if len(sys.argv) > 3 else None) as tmp:
+        print("profile rows batch insert[s] rows/s close[s] query[s] size[MB]")
+        for profile in results.profiles:
+            datafile = path.join(tmp, "%s.db" % profile)
+            runid, inserted, closed = insert(datafile, profile, rows, batch)
+            queried = query(datafile, profile, runid)
+            size = sum(path.getsize(f) for f in [datafile, datafile + "-wal"] if path.exists(f)) / 2**20
+            print("%s %d %d %.2f %.0f %.2f %.2f %.0f" % (profile, rows, batch, inserted, rows / inserted, closed, queried, size))
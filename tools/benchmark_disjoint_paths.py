@@ -0,0 +1,100 @@
+# Copyright (c) 2025 ETH Zurich.
+#                    All rights reserved.
+#
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+# Microbenchmark of the length-bounded greedy Ford-Fulkerson c_XY of the disjoint
+# path and interference analyses: a CSR copy per pair with sparse matvec BFS and
+# port bitmasks versus the residual graph (analysis/residual.py), one pair at a
+# time and 64 pairs per batch of bit lanes.
+#
+# run from the repository root: python3 -m tools.benchmark_disjoint_paths [samples]
+
+import random
+import sys
+import warnings
+from time import perf_counter
+
+import numpy as np
+from scipy.sparse import csr_matrix, SparseEfficiencyWarning
+
+from analysis.residual import ResidualGraph
+from topogen import toponames
+from topogen.common import from_list_graph_to_sparse_matrix
+
+bits = np.array(2**np.arange(50), dtype=np.int64)
+
+def prepare_graph(g):
+    h = csr_matrix(g)
+    for i in range(g.shape[0]):
+        idx = h[i,:].nonzero()[1]
+        h[i,idx] = 2**np.arange(len(idx))
+    return h
+
+def bfs(X, Y, limit, h):
+    fringe = np.zeros((h.shape[0],))
+    seen = np.zeros((h.shape[0],))
+    fringe[X] = 1
+    seen[X] = -1
+    for _ in range(limit):
+        step = h.dot(fringe)
+        new = (step > 0) & (seen == 0)
+        fringe[new] = 1
+        seen[new] = step[new]
+        if new[Y].any():
+            break
+    found = seen[Y] > 0
+    if not found.any():
+        return None
+    cur = Y[found.nonzero()[0][0]]
+    path = []
+    while cur not in X:
+        nextport = ((bits & np.int64(seen[cur])) > 0).nonzero()[0][0]
+        next = h[cur,:].indices[nextport]
+        path.append((cur, next))
+        cur = next
+    return path
+
+def c_XY(X, Y, limit, h):
+    g = h.tocsr(copy=True)
+    res = np.zeros((limit+1,), dtype=np.int32)
+    while True:
+        p = bfs(X, Y, limit, g)
+        if not p: break
+        res[len(p):] += 1
+        for s,t in p:
+            g[s,t] = 0
+            g[t,s] = 0
+    return res
+
+def legacy(graph, pairs, limit):
+    h = prepare_graph(graph)
+    return [c_XY([a], [b], limit, h) for a, b in pairs]
+
+def residual(graph, pairs, limit):
+    h = ResidualGraph(graph)
+    return [h.c_XY([a], [b], limit) for a, b in pairs]
+
+def batched(graph, pairs, limit):
+    h = ResidualGraph(graph)
+    return h.c_XY_many([([a], [b]) for a, b in pairs], limit)
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    limit = 4
+    warnings.simplefilter('ignore', SparseEfficiencyWarning)
+    print("topology routers radix samples legacy[s] residual[s] batched[s] speedup equal")
+    for name, N in [('SF', 200), ('SF', 1000), ('DF', 2000), ('FT', 2000), ('HC', 1024), ('HX2', 1000)]:
+        network = toponames[name](N=N)
+        graph = from_list_graph_to_sparse_matrix(network.get_topo())
+        r = list(range(0, network.edge))
+        pairs = [random.sample(r, 2) for _ in range(0, count)]
+        times = []
+        out = []
+        for f in [legacy, residual, batched]:
+            start = perf_counter()
+            out.append(f(graph, pairs, limit))
+            times.append(perf_counter() - start)
+        equal = all(np.array_equal(x, y) and np.array_equal(x, z) for x, y, z in zip(*out))
+        print("%s %d %d %d %.3f %.3f %.3f %.1fx %s" % (network.name, network.R, network.nr, count, times[0], times[1], times[2], times[0] / times[2], equal))
@@ -0,0 +1,72 @@
+# Copyright (c) 2025 ETH Zurich.
+#                    All rights reserved.
+#
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+# Microbenchmark of the per-length pair lookup in the shortest path analysis:
+# Python loop over (s,t) pairs with one collect() per hit versus array-based
+# gathers with one bulk insert per length.
+#
+# run from the repository root: python3 -m tools.benchmark_pair_lookup [samples]
+
+import random
+import sys
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import numpy as np
+
+from analysis.common import sample_pairs
+from analysis.results import Results
+from topogen import toponames
+from topogen.common import from_list_graph_to_sparse_matrix
+
+
+def powers(graph, limit):
+    acc = np.identity(graph.shape[0], dtype=np.uint32)
+    adjacency = graph.toarray().astype(np.uint32)
+    steps = []
+    for _ in range(limit):
+        acc = acc.dot(adjacency)
+        steps.append(acc)
+    return steps
+
+def loop(steps, edge, count, collect):
+    r = list(range(0, edge))
+    pairs = [random.sample(r, 2) for _ in range(0, count)]
+    connected = np.zeros_like(steps[0], dtype=np.bool_)
+    for i, step in enumerate(steps):
+        shortest = np.multiply(step, ~connected)
+        connected += (step != 0)
+        for s, t in pairs:
+            if shortest[s,t]:
+                collect(len=i+1, multiplicity=step[s,t])
+
+def vectorized(steps, edge, count, collect):
+    s, t = sample_pairs(edge, count)
+    unresolved = np.ones(len(s), dtype=np.bool_)
+    for i, step in enumerate(steps):
+        values = step[s[unresolved], t[unresolved]]
+        reached = values != 0
+        collect.many(len=np.full(np.count_nonzero(reached), i+1), multiplicity=values[reached])
+        unresolved[np.flatnonzero(unresolved)[reached]] = False
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    limit = 4
+    print("topology routers samples loop[s] vectorized[s] speedup")
+    with TemporaryDirectory() as tmp:
+        for name, N in [('SF', 200), ('SF', 1000), ('DF', 2000), ('FT', 2000), ('HC', 1024)]:
+            network = toponames[name](N=N)
+            steps = powers(from_list_graph_to_sparse_matrix(network.get_topo()), limit)
+            times = []
+            for f in [loop, vectorized]:
+                res = Results("%s/%s_%s_%d.db" % (tmp, f.__name__, name, N))
+                collect = res.collector(len=Results.Int, multiplicity=Results.Int, topo=network.name)
+                start = perf_counter()
+                f(steps, network.edge, count, collect)
+                res.commit()
+                times.append(perf_counter() - start)
+                res.close()
+            print("%s %d %d %.3f %.3f %.1fx" % (network.name, network.R, count, times[0], times[1], times[0] / times[1]))
@@ -25,6 +25,7 @@ class HyperX(Topology):
             N: total number of endnodes  
             edge: number that indicates routers with endnodes (the first edge routers in topo have endnodes)
             name: name of topology (default := HX)
+            vertex_transitive: True, all routers are equivalent (class attribute)
         Private:
             __topo: holds None or the topology in adjacency list
 
@@ -32,6 +33,7 @@ class HyperX(Topology):
         get_topo(): return the topology in adjacency list
         get_jellyfish_eq(): return jellyfish topology that uses same infrastructure
     """
+    vertex_transitive = True
 
     def __init__(self, l = -1, s = -1, N = -1):
         """
@@ -24,6 +24,7 @@ class Hypercube(Topology):
             N: total number of endnodes
             edge: number that indicates routers with endnodes (the first edge routers in topo have endnodes)
             name: name of topology (default := HC)
+            vertex_transitive: True, all routers are equivalent (class attribute)
         
         Private:
             __topo: holds None or the topology in adjacency list
@@ -32,6 +33,7 @@ class Hypercube(Topology):
         get_topo(): return the topology in adjacency list
         get_jellyfish_eq(): return jellyfish topology that uses same infrastructure
     """
+    vertex_transitive = True
     def __init__(self, n = -1, N = -1):
         """
         Parameters:
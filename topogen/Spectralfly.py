@@ -27,6 +27,7 @@ class Spectralfly(Topology):
             N: total number of endnodes
             edge: number that indicates routers with endnodes (the first edge routers in topo have endnodes)
             name: name of topology (default := SpF)
+            vertex_transitive: True, all routers are equivalent (class attribute)
         
         Private:
             __topo: holds None or the topology in adjacency list
@@ -35,6 +36,7 @@ class Spectralfly(Topology):
         get_topo(): return the topology in adjacency list
         get_jellyfish_eq(): return jellyfish topology that uses same infrastructure
     """
+    vertex_transitive = True
    
     def __init__(self, v = -1, w = -1, N = -1):
         """
@@ -16,6 +16,9 @@ class Topology:
     edge = None
     __topo = None
     name = None
+    # True if every router is mapped to every other one by some automorphism that
+    # preserves endpoints, so all routers see the same distributions
+    vertex_transitive = False
 
     def __init___(self, **kwargs): 
         raise NotImplementedError
@@ -25,6 +25,7 @@ class Torus(Topology):
             N: total number of endnodes
             edge: number that indicates routers with endnodes (the first edge routers in topo have endnodes)
             name: name of topology (default := nDTorus)
+            vertex_transitive: True, all routers are equivalent (class attribute)
         
         Private:
             __topo: holds None or the topology in adjacency list
@@ -33,6 +34,7 @@ class Torus(Topology):
         get_topo(): return the topology in adjacency list
         get_jellyfish_eq(): return jellyfish topology that uses same infrastructure
     """
+    vertex_transitive = True
     
     def __init__(self, n = -1, k = -1, N = -1):
         """
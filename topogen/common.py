@@ -140,11 +140,11 @@ def read_matrixgraph(filepath: str):
     
     return matrix_graph
 
-def from_list_graph_to_matrix_graph(list_graph : [[int]]):
+def from_list_graph_to_matrix_graph(list_graph : [[int]], dtype=np.float64):
     vertices = len(list_graph)
     edges = int(sum([len(row) for row in list_graph]) / 2)
 
-    matrix_graph = np.matrix(np.zeros((vertices, vertices)), dtype=np.float64)
+    matrix_graph = np.matrix(np.zeros((vertices, vertices), dtype=dtype))
 
     for i in range(vertices):
         for j in list_graph[i]: